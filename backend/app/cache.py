@@ -0,0 +1,68 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+class LRUCache:
+    """Thread-safe, size-bounded LRU cache with optional per-entry expiry.
+
+    Entries are evicted least-recently-used first once ``maxsize`` is reached.
+    ``ttl`` (seconds) sets a default lifetime; ``set(..., expires_at=...)``
+    overrides it per entry. Hit/miss counters are kept for monitoring.
+    """
+
+    def __init__(self, maxsize: int, ttl: float | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Hashable, tuple[Any, float | None]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                value, expires_at = item
+                if expires_at is None or expires_at > time.time():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """Like get(), but without touching recency or the hit/miss counters."""
+        with self._lock:
+            item = self._data.get(key)
+        if item is None or (item[1] is not None and item[1] <= time.time()):
+            return default
+        return item[0]
+
+    def set(self, key: Hashable, value: Any, expires_at: float | None = None) -> None:
+        if self.maxsize <= 0:
+            return
+        if expires_at is None and self.ttl is not None:
+            expires_at = time.time() + self.ttl
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.pop(key, None)
+        return default if item is None else item[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
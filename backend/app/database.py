@@ -1,6 +1,13 @@
 import os
-from sqlalchemy import create_engine
+import threading
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 
 def get_database_url() -> str:
@@ -18,12 +25,150 @@ def get_database_url() -> str:
     return f"postgresql://{user}:{password}@{host}:{port}/{dbname}"
 
 
+def get_async_database_url(url: str) -> str:
+    """Swap the sync driver in a database URL for its asyncio counterpart."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "postgresql":
+        return parsed.set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+    if backend == "sqlite":
+        return parsed.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    return url
+
+
 DATABASE_URL = get_database_url()
+ASYNC_DATABASE_URL = get_async_database_url(DATABASE_URL)
+# Optional streaming replica for read-only endpoints; unset means read from the primary
+READ_DATABASE_URL = os.getenv("READ_DATABASE_URL")
+
+# Per engine, per worker process: at most DB_POOL_SIZE + DB_MAX_OVERFLOW connections
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+# Seconds a request waits for a free connection before failing
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Reconnect connections older than this (seconds), ahead of server/proxy idle timeouts
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+
+class PoolWaitStats:
+    """Adds checkout wait-time counters to a SQLAlchemy queue pool.
+
+    The wait covers queueing for a free connection and, when the pool grows,
+    opening a new one.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self._stats_lock = threading.Lock()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            timed_out = True
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                self.checkouts += 1
+                self.timeouts += timed_out
+                self.wait_seconds_total += waited
+                self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
 
-engine = create_engine(DATABASE_URL)
+class InstrumentedQueuePool(PoolWaitStats, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(PoolWaitStats, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_options(url: str) -> dict:
+    options = {"pool_pre_ping": DB_POOL_PRE_PING, "pool_recycle": DB_POOL_RECYCLE}
+    # SQLite (local runs) keeps SQLAlchemy's default pooling
+    if make_url(url).get_backend_name() != "sqlite":
+        options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+    return options
+
+
+engine = create_engine(DATABASE_URL, poolclass=InstrumentedQueuePool, **pool_options(DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+if READ_DATABASE_URL:
+    read_engine = create_engine(READ_DATABASE_URL, poolclass=InstrumentedQueuePool, **pool_options(READ_DATABASE_URL))
+else:
+    read_engine = engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+async_engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=InstrumentedAsyncQueuePool, **pool_options(ASYNC_DATABASE_URL))
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+def pool_stats(db_engine) -> dict:
+    """Occupancy and checkout wait times of an engine's connection pool."""
+    pool = db_engine.pool
+    stats = {}
+    if isinstance(pool, QueuePool):
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        stats.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),
+            capacity=capacity,
+            saturation=round(pool.checkedout() / capacity, 3) if capacity else None,
+        )
+    if isinstance(pool, PoolWaitStats):
+        stats.update(
+            checkouts=pool.checkouts,
+            timeouts=pool.timeouts,
+            wait_seconds_avg=round(pool.wait_seconds_total / pool.checkouts, 6) if pool.checkouts else 0.0,
+            wait_seconds_max=round(pool.wait_seconds_max, 6),
+        )
+    return stats
+
+
+def database_pool_stats() -> dict:
+    stats = {"primary": pool_stats(engine), "async": pool_stats(async_engine.sync_engine)}
+    if read_engine is not engine:
+        stats["replica"] = pool_stats(read_engine)
+    return stats
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Arbitrary pg_advisory_lock key; serializes startup migrations across workers
+MIGRATION_LOCK_KEY = 7254071
+
+
+def run_migrations() -> None:
+    """Upgrade the database to the latest Alembic revision."""
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    config.attributes["configure_logger"] = False
+
+    with engine.connect() as connection:
+        connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        # Session-level lock survives the commit; Alembic needs an idle connection
+        connection.commit()
+        try:
+            config.attributes["connection"] = connection
+            command.upgrade(config, "head")
+        finally:
+            connection.rollback()
+            connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+            connection.commit()
+
 
 def get_db():
     db = SessionLocal()
@@ -31,3 +176,20 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_read_db():
+    """Session for read-only endpoints; uses the replica when READ_DATABASE_URL is set.
+
+    Replicas lag slightly, so never use it to read back a write from the same request flow.
+    """
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
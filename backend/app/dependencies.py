@@ -1,10 +1,35 @@
+import os
+
 from fastapi import Header, HTTPException, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, make_transient_to_detached
 from firebase_admin import auth as firebase_auth
 
+from .cache import LRUCache
 from .database import get_db
 from .models import User
-from .services.firebase_auth import verify_token
+from .services.firebase_auth import verify_token, token_cache
+
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "300"))
+
+# firebase_uid -> detached User snapshot, merged into each request's session
+user_cache = LRUCache(USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+
+def _snapshot(user: User) -> User:
+    """Copy a loaded User into a detached instance that is safe to share."""
+    snapshot = User(**{column.key: getattr(user, column.key) for column in User.__table__.columns})
+    make_transient_to_detached(snapshot)
+    return snapshot
+
+
+def invalidate_cached_user(firebase_uid: str) -> None:
+    """Drop a cached user after its row changes."""
+    user_cache.pop(firebase_uid)
+
+
+def auth_cache_stats() -> dict:
+    return {"tokens": token_cache.stats(), "users": user_cache.stats()}
 
 
 async def get_current_user_optional(
@@ -50,6 +75,10 @@ async def get_current_user_optional(
 
     # Get or create user
     firebase_uid = decoded["uid"]
+    if cached := user_cache.get(firebase_uid):
+        # Attach the cached copy without a SELECT
+        return db.merge(cached, load=False)
+
     user = db.query(User).filter(User.firebase_uid == firebase_uid).first()
 
     if not user:
@@ -65,6 +94,7 @@ async def get_current_user_optional(
         db.commit()
         db.refresh(user)
 
+    user_cache.set(firebase_uid, _snapshot(user))
     return user
 
 
@@ -1,29 +1,54 @@
 # Chess Backend (Triggered redeploy 2026-01-19)
 import os
+import io
+import json
+import asyncio
+import tempfile
+from contextlib import aclosing
+from datetime import datetime
 from uuid import UUID
 
-from fastapi import FastAPI, Depends, HTTPException
+import chess
+import chess.engine
+from fastapi import FastAPI, Depends, HTTPException, Query, Header, Request, Response, WebSocket
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from .database import get_db, engine, Base
+from .metrics import MetricsMiddleware, render_metrics, stage
+from .database import AsyncSessionLocal, ReadSessionLocal, SessionLocal, get_db, get_read_db, get_async_db, run_migrations, database_pool_stats
 from .models import Game, Move, User
-from .schemas import CreateGameRequest, GameResponse, MoveRequest, MoveResponse, MoveInfo, UserResponse, GameSummary, UserGamesResponse, TutorRequest, TutorResponse
-from .services.chess_service import ChessService, STARTING_FEN
-from .services.ai_service import StockfishAI
-from .dependencies import get_current_user_optional, get_current_user_required
-
-from .routers import auth
+from .schemas import CreateGameRequest, GameResponse, MoveRequest, MoveResponse, MoveInfo, UserResponse, GameSummary, UserGamesResponse, PgnImportResponse, TutorRequest, TutorResponse
+from .services.chess_service import ChessService, STARTING_FEN, STARTING_HISTORY, board_cache
+from .services.move_codec import MOVE_STORAGE, append_move, ply_count, unpack_moves
+from .services.ai_service import EnginePoolTimeout, ai
+from .services.ponder import ponderer
+from .services.explorer import index_game
+from .services.game_events import game_hub
+from .services.pgn_service import export_games, import_pgn
+from .services.review_service import review_service
+from .dependencies import get_current_user_optional, get_current_user_required, auth_cache_stats
+from .pagination import encode_cursor, decode_cursor
+
+from .routers import auth, analysis, explorer, review
 
 app = FastAPI(title="Chess API", version="1.0.0")
 
 app.include_router(auth.router)
+app.include_router(analysis.router)
+app.include_router(review.router)
+app.include_router(explorer.router)
 
 CORS_ORIGINS = os.getenv(
     "CORS_ORIGINS",
     "http://localhost:5173,http://127.0.0.1:5173"
 ).split(",")
 
+app.add_middleware(MetricsMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=CORS_ORIGINS,
@@ -32,12 +57,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-ai = StockfishAI()
-
 
 @app.on_event("startup")
 def on_startup():
-    Base.metadata.create_all(bind=engine)
+    run_migrations()
+
+
+@app.on_event("startup")
+async def start_game_events():
+    await game_hub.start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    ponderer.close()
+    await ai.close()
+    review_service.close()
+    await game_hub.close()
 
 
 @app.post("/games", response_model=GameResponse, status_code=201)
@@ -48,6 +84,7 @@ def create_game(
 ):
     game = Game(
         current_position=STARTING_FEN,
+        position_hashes=STARTING_HISTORY,
         turn="white",
         status="active",
         difficulty=request.difficulty,
@@ -68,15 +105,48 @@ def create_game(
     )
 
 
+def game_etag(move_count: int, updated_at: datetime | None) -> str:
+    """Weak ETag that changes whenever a move is added or the game row changes."""
+    stamp = updated_at.isoformat() if updated_at else ""
+    return f'W/"{move_count}-{stamp}"'
+
+
 @app.get("/games/{game_id}", response_model=GameResponse)
-def get_game(game_id: UUID, db: Session = Depends(get_db)):
-    game = db.query(Game).filter(Game.id == game_id).first()
+def get_game(
+    game_id: UUID,
+    response: Response,
+    since: int | None = Query(None, ge=0),
+    if_none_match: str | None = Header(None),
+    db: Session = Depends(get_read_db),
+):
+    """Return a game and its moves.
+
+    ``since`` limits ``moves`` to those after that move number, so pollers
+    only receive new plies. The ETag covers the whole game state, so a
+    matching ``If-None-Match`` returns 304 with no body.
+    """
+    # Only the columns the response and ETag need; checkpoints and
+    # position_hashes can be much larger than the rest of the row
+    game = db.execute(
+        select(
+            Game.id, Game.status, Game.turn, Game.result, Game.current_position,
+            Game.difficulty, Game.move_data, Game.updated_at,
+        ).where(Game.id == game_id)
+    ).first()
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
 
+    move_count = ply_count(game.move_data)
+    etag = game_etag(move_count, game.updated_at)
+    if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
+    # Decoded from the packed move list on the game row; no moves query
+    start = since or 0
     moves = [
-        MoveInfo(move_number=m.move_number, move=m.move_input)
-        for m in game.moves
+        MoveInfo(move_number=move_number, move=move.uci())
+        for move_number, move in enumerate(unpack_moves(game.move_data)[start:], start=start + 1)
     ]
 
     return GameResponse(
@@ -87,79 +157,141 @@ def get_game(game_id: UUID, db: Session = Depends(get_db)):
         current_position=game.current_position,
         difficulty=game.difficulty,
         moves=moves,
+        move_count=move_count,
+    )
+
+
+def record_move(db, game: Game, move_number: int, move_uci: str, notation: str, board: chess.Board, fen: str) -> None:
+    """Append a ply to the game's packed move list and, in rows mode, to the moves table."""
+    game.move_data, game.checkpoints = append_move(
+        game.move_data, game.checkpoints, chess.Move.from_uci(move_uci), board
     )
+    if MOVE_STORAGE == "rows":
+        db.add(Move(
+            game_id=game.id,
+            move_number=move_number,
+            move_input=move_uci,
+            move_notation=notation,
+            position_after=fen,
+        ))
+
+
+def move_event(game: Game, ply: int, move_uci: str, san: str, by: str) -> dict:
+    return {
+        "type": "move",
+        "game_id": str(game.id),
+        "ply": ply,
+        "move": move_uci,
+        "san": san,
+        "by": by,
+        "current_position": game.current_position,
+        "turn": game.turn,
+        "status": game.status,
+        "result": game.result,
+    }
+
+
+def status_event(game: Game) -> dict:
+    return {"type": "status", "game_id": str(game.id), "status": game.status, "result": game.result}
 
 
 @app.post("/games/{game_id}/move", response_model=MoveResponse)
-def submit_move(game_id: UUID, move_req: MoveRequest, db: Session = Depends(get_db)):
-    game = db.query(Game).filter(Game.id == game_id).first()
+async def submit_move(game_id: UUID, move_req: MoveRequest, db: AsyncSession = Depends(get_async_db)):
+    game = await db.get(Game, game_id)
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
 
     if game.status == "finished":
         raise HTTPException(status_code=409, detail="Game is already finished")
 
-    chess_svc = ChessService(game.current_position)
-
-    if not chess_svc.is_legal_move(move_req.move):
+    position_before = game.current_position
+    plies_before = ply_count(game.move_data)
+    with stage("board"):
+        chess_svc = ChessService.for_game(game.id, game.current_position, game.position_hashes)
+        # Legality, SAN and outcome in a single pass
+        notation = chess_svc.play(move_req.move)
+    if notation is None:
+        chess_svc.release(game.id)
         raise HTTPException(status_code=422, detail="Illegal move")
 
+    # Answer precomputed while the human was thinking; also stops stale pondering
+    pondered_move = ponderer.take(game.id, position_before, move_req.move)
+
+    # Find the computer's reply before anything is stored: if no engine can be
+    # had, the client gets a 503 and the game is unchanged, so it can simply
+    # retry instead of being left waiting for a reply that never comes
+    computer_move_uci = None
+    if not chess_svc.is_game_over():
+        computer_move_uci = pondered_move
+        if computer_move_uci is None:
+            # End the read transaction so no connection is held during the search
+            await db.commit()
+            try:
+                computer_move_uci = await ai.select_move(
+                    chess_svc.fen, game.difficulty, game_id=game.id, user_id=game.user_id,
+                )
+            except (EnginePoolTimeout, chess.engine.EngineError) as e:
+                print(f"No computer move for game {game.id}: {e}")
+                chess_svc.release(game.id)
+                raise HTTPException(status_code=503, detail="Engine busy, try again", headers={"Retry-After": "1"})
+
+    # Another request for this game may have moved meanwhile: lock the row
+    # and check nothing changed since it was read, or both would write a ply
+    game = await db.get(Game, game_id, with_for_update=True, populate_existing=True)
+    if game.current_position != position_before or ply_count(game.move_data) != plies_before:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Game changed meanwhile, reload it")
+
     last_moves = []
+    events = []
 
     # Apply human move
-    move_number = len(game.moves) + 1
-    notation = chess_svc.make_move(move_req.move)
-
-    human_move = Move(
-        game_id=game.id,
-        move_number=move_number,
-        move_input=move_req.move,
-        move_notation=notation,
-        position_after=chess_svc.fen,
-    )
-    db.add(human_move)
+    move_number = plies_before + 1
+    record_move(db, game, move_number, move_req.move, notation, chess_svc.board, chess_svc.fen)
     last_moves.append(move_req.move)
 
     game.current_position = chess_svc.fen
+    game.position_hashes = chess_svc.history
     game.turn = chess_svc.turn
 
-    # Check for game end after human move
     if chess_svc.is_game_over():
         game.status = "finished"
         game.result = chess_svc.get_result()
-        db.commit()
-        return MoveResponse(
-            status=game.status,
-            turn=game.turn,
-            result=game.result,
-            current_position=game.current_position,
-            last_moves=last_moves,
-        )
+    events.append(move_event(game, move_number, move_req.move, notation, "human"))
 
-    # Computer move
-    computer_move_uci = ai.select_move(chess_svc.fen, game.difficulty)
     if computer_move_uci:
+        # Computer move
         move_number += 1
-        notation = chess_svc.make_move(computer_move_uci)
-
-        computer_move = Move(
-            game_id=game.id,
-            move_number=move_number,
-            move_input=computer_move_uci,
-            move_notation=notation,
-            position_after=chess_svc.fen,
-        )
-        db.add(computer_move)
+        with stage("board"):
+            notation = chess_svc.play(computer_move_uci)
+        record_move(db, game, move_number, computer_move_uci, notation, chess_svc.board, chess_svc.fen)
         last_moves.append(computer_move_uci)
 
         game.current_position = chess_svc.fen
+        game.position_hashes = chess_svc.history
         game.turn = chess_svc.turn
+        events.append(move_event(game, move_number, computer_move_uci, notation, "computer"))
 
         if chess_svc.is_game_over():
             game.status = "finished"
             game.result = chess_svc.get_result()
 
-    db.commit()
+    if game.status == "finished":
+        await index_game(db, game)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Lost a race the row lock could not see, e.g. a duplicate ply in the moves table
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Game changed meanwhile, reload it")
+
+    for event in events:
+        await game_hub.publish(game.id, event)
+    if game.status == "finished":
+        await game_hub.publish(game.id, status_event(game))
+    else:
+        chess_svc.release(game.id)
+        ponderer.start(game.id, game.current_position, game.difficulty)
 
     return MoveResponse(
         status=game.status,
@@ -170,11 +302,78 @@ def submit_move(game_id: UUID, move_req: MoveRequest, db: Session = Depends(get_
     )
 
 
+@app.websocket("/games/{game_id}/ws")
+async def game_channel(websocket: WebSocket, game_id: UUID):
+    """Push a game's move and status events as they happen.
+
+    The first message is a snapshot of the game. A {"type": "resync"}
+    message means events were dropped because the client fell behind, and
+    it should refetch the game over HTTP.
+    """
+    # Subscribe before reading the snapshot so no event falls in between
+    async with game_hub.subscribe(game_id) as queue:
+        async with AsyncSessionLocal() as db:
+            game = await db.get(Game, game_id)
+        if game is None:
+            await websocket.close(code=4404)
+            return
+
+        await websocket.accept()
+        await websocket.send_json({
+            "type": "snapshot",
+            "game_id": str(game.id),
+            "status": game.status,
+            "turn": game.turn,
+            "result": game.result,
+            "current_position": game.current_position,
+            "difficulty": game.difficulty,
+            "move_count": ply_count(game.move_data),
+        })
+
+        async def forward():
+            while True:
+                await websocket.send_text(await queue.get())
+
+        async def wait_for_disconnect():
+            # Clients send nothing we need; reading only notices the close
+            while (await websocket.receive())["type"] != "websocket.disconnect":
+                pass
+
+        tasks = [asyncio.ensure_future(forward()), asyncio.ensure_future(wait_for_disconnect())]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+        for task in done:
+            # Retrieve the error of a send to a client that just went away
+            task.exception()
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/health/caches")
+def cache_stats():
+    from .services.tutor import tutor_service
+
+    return {**auth_cache_stats(), "replies": ai.replies.cache.stats(), "boards": board_cache.stats(), "ponder": ponderer.stats(), "tutor": tutor_service.cache.stats()}
+
+
+@app.get("/health/pools")
+def pool_stats():
+    """Database connection pools next to the engine pool, to tell DB pressure from engine pressure."""
+    return {"database": database_pool_stats(), "engines": ai.pool.stats()}
+
+
 @app.get("/users/me", response_model=UserResponse)
 def get_current_user_profile(
     current_user: User = Depends(get_current_user_required),
@@ -190,24 +389,112 @@ def get_current_user_profile(
 
 @app.get("/users/me/games", response_model=UserGamesResponse)
 def get_current_user_games(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = None,
+    updated_since: datetime | None = None,
     current_user: User = Depends(get_current_user_required),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
-    games = db.query(Game).filter(Game.user_id == current_user.id).order_by(Game.created_at.desc()).all()
+    """List the user's games, newest first, one page at a time.
+
+    Pages are keyset-paginated on (created_at, id); pass ``next_cursor`` from
+    the previous page as ``cursor``. With ``updated_since`` the endpoint
+    instead returns games changed at or after that time, oldest change first
+    and paginated on (updated_at, id), so clients can sync incrementally.
+    """
+    # Two bytes per ply in the packed move list
+    move_count = func.coalesce(func.length(Game.move_data), 0) // 2
+    query = db.query(
+        Game.id,
+        Game.status,
+        Game.result,
+        Game.difficulty,
+        Game.created_at,
+        Game.updated_at,
+        move_count.label("move_count"),
+    ).filter(Game.user_id == current_user.id)
+
+    if updated_since is not None:
+        sort_column = Game.updated_at
+        query = query.filter(Game.updated_at >= updated_since)
+        if cursor:
+            query = query.filter(tuple_(Game.updated_at, Game.id) > decode_cursor(cursor))
+        query = query.order_by(Game.updated_at.asc(), Game.id.asc())
+    else:
+        sort_column = Game.created_at
+        if cursor:
+            query = query.filter(tuple_(Game.created_at, Game.id) < decode_cursor(cursor))
+        query = query.order_by(Game.created_at.desc(), Game.id.desc())
+
+    # Fetch one extra row to learn whether another page exists
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, sort_column.key), last.id)
 
     game_summaries = [
         GameSummary(
-            game_id=game.id,
-            status=game.status,
-            result=game.result,
-            difficulty=game.difficulty,
-            move_count=len(game.moves),
-            created_at=game.created_at.isoformat(),
+            game_id=row.id,
+            status=row.status,
+            result=row.result,
+            difficulty=row.difficulty,
+            move_count=row.move_count,
+            created_at=row.created_at.isoformat(),
+            updated_at=row.updated_at.isoformat(),
         )
-        for game in games
+        for row in rows
     ]
 
-    return UserGamesResponse(games=game_summaries)
+    return UserGamesResponse(games=game_summaries, next_cursor=next_cursor)
+
+
+# Uploads are spooled to memory up to this size, then to a temporary file
+PGN_SPOOL_SIZE = 8 * 1024 * 1024
+PGN_IMPORT_MAX_BYTES = int(os.getenv("PGN_IMPORT_MAX_BYTES", str(200 * 1024 * 1024)))
+
+
+@app.get("/users/me/games.pgn")
+def export_current_user_games(current_user: User = Depends(get_current_user_required)):
+    """All of the user's games as one PGN file, streamed with constant memory."""
+    player = current_user.username or current_user.display_name or "Player"
+
+    def pgn():
+        # The stream outlives request-scoped dependencies, so open our own session
+        with ReadSessionLocal() as db:
+            yield from export_games(db, current_user.id, player)
+
+    return StreamingResponse(
+        pgn(),
+        media_type="application/x-chess-pgn",
+        headers={"Content-Disposition": 'attachment; filename="games.pgn"'},
+    )
+
+
+@app.post("/users/me/games.pgn", response_model=PgnImportResponse)
+async def import_current_user_games(request: Request, current_user: User = Depends(get_current_user_required)):
+    """Import games from a PGN file sent as the raw request body.
+
+    Games from a non-standard start position, games with illegal moves and
+    unfinished games (no result, and not over on the board) are skipped.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=PGN_SPOOL_SIZE) as spool:
+        size = 0
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > PGN_IMPORT_MAX_BYTES:
+                raise HTTPException(status_code=413, detail="PGN file too large")
+            spool.write(chunk)
+        spool.seek(0)
+
+        def run_import():
+            handle = io.TextIOWrapper(spool, encoding="utf-8-sig", errors="replace")
+            with SessionLocal() as db:
+                return import_pgn(db, handle, current_user.id)
+
+        counts = await run_in_threadpool(run_import)
+    return PgnImportResponse(**counts)
 
 
 @app.post("/tutor/explain", response_model=TutorResponse)
@@ -222,7 +509,41 @@ async def explain_move(
         move_uci=request.move,
         best_move_uci=request.best_move,
         player_pv=request.player_pv,
-        best_pv=request.best_pv
+        best_pv=request.best_pv,
+        alternative_move=request.alternative_move,
+        alternative_pv=request.alternative_pv,
     )
     return TutorResponse(explanation=explanation)
 
+
+
+@app.post("/tutor/explain/stream")
+async def explain_move_stream(
+    request: TutorRequest,
+    http_request: Request,
+    current_user: User | None = Depends(get_current_user_optional),
+):
+    """Server-sent events: "delta" events with text chunks, then "done" with the full text."""
+    from .services.tutor import tutor_service
+
+    async def events():
+        parts = []
+        stream = tutor_service.explain_move_stream(
+            fen=request.fen,
+            move_uci=request.move,
+            best_move_uci=request.best_move,
+            player_pv=request.player_pv,
+            best_pv=request.best_pv,
+            alternative_move=request.alternative_move,
+            alternative_pv=request.alternative_pv,
+        )
+        # aclosing: leaving early closes the generator, which closes the upstream call
+        async with aclosing(stream):
+            async for text in stream:
+                if await http_request.is_disconnected():
+                    return
+                parts.append(text)
+                yield f"event: delta\ndata: {json.dumps({'text': text})}\n\n"
+        yield f"event: done\ndata: {json.dumps({'explanation': ''.join(parts)})}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
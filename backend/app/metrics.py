@@ -0,0 +1,134 @@
+"""Prometheus metrics: request latency, per-stage timings and DB usage per request.
+
+Stages are timed with ``stage("name")``; the DB stage is recorded
+automatically from SQLAlchemy cursor events. Each request's stage times are
+accumulated in a context variable, so the middleware can also report the
+time spent outside every named stage (validation, serialization, framework).
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Fine buckets at the low end: most stages take well under 10 ms
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100, 250)
+
+REQUESTS = Counter("http_requests_total", "HTTP requests", ["method", "route", "status"])
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "HTTP request latency", ["method", "route"], buckets=LATENCY_BUCKETS)
+STAGE_SECONDS = Histogram("stage_duration_seconds", "Time spent in one stage of request handling", ["stage"], buckets=LATENCY_BUCKETS)
+REQUEST_STAGE_SECONDS = Histogram(
+    "request_stage_seconds", "Per-request total time in each stage", ["route", "stage"], buckets=LATENCY_BUCKETS,
+)
+DB_QUERY_SECONDS = Histogram("db_query_duration_seconds", "Single SQL statement latency", buckets=LATENCY_BUCKETS)
+DB_QUERIES_PER_REQUEST = Histogram("db_queries_per_request", "SQL statements per HTTP request", ["route"], buckets=COUNT_BUCKETS)
+
+# Engine admission control, see services.ai_service.AsyncEnginePool; autoscale on these
+ENGINE_QUEUE_DEPTH = Gauge("engine_queue_depth", "Requests waiting for an engine", ["priority"])
+ENGINE_QUEUE_WAIT_SECONDS = Histogram(
+    "engine_queue_wait_seconds", "Time from asking for an engine to getting one", ["priority"], buckets=LATENCY_BUCKETS,
+)
+ENGINE_SHED = Counter("engine_shed_total", "Engine requests degraded or refused under load", ["priority", "action"])
+
+
+class RequestStages:
+    """Stage totals of the request being handled."""
+
+    __slots__ = ("seconds", "db_queries")
+
+    def __init__(self):
+        self.seconds: dict[str, float] = {}
+        self.db_queries = 0
+
+    def add(self, name: str, elapsed: float) -> None:
+        self.seconds[name] = self.seconds.get(name, 0.0) + elapsed
+
+
+_current: ContextVar[RequestStages | None] = ContextVar("request_stages", default=None)
+
+
+def record_stage(name: str, elapsed: float) -> None:
+    STAGE_SECONDS.labels(name).observe(elapsed)
+    if (stages := _current.get()) is not None:
+        stages.add(name, elapsed)
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block as stage ``name``; stages should not nest."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - started)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_started"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop("query_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    DB_QUERY_SECONDS.observe(elapsed)
+    if (stages := _current.get()) is not None:
+        stages.add("db", elapsed)
+        stages.db_queries += 1
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (no extra task per request, unlike BaseHTTPMiddleware).
+
+    Routes are labelled by their path template, e.g. /games/{game_id}/move,
+    so label cardinality stays bounded. Streaming responses are measured
+    until their last body chunk.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stages = RequestStages()
+        token = _current.set(stages)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            elapsed = time.perf_counter() - started
+            route = scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            method = scope["method"]
+
+            REQUESTS.labels(method, path, status).inc()
+            REQUEST_SECONDS.labels(method, path).observe(elapsed)
+            DB_QUERIES_PER_REQUEST.labels(path).observe(stages.db_queries)
+            for name, seconds in stages.seconds.items():
+                REQUEST_STAGE_SECONDS.labels(path, name).observe(seconds)
+            # Stages of background work started by the request can overlap it,
+            # so clamp rather than report negative framework time
+            other = max(elapsed - sum(stages.seconds.values()), 0.0)
+            REQUEST_STAGE_SECONDS.labels(path, "other").observe(other)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    return generate_latest(), CONTENT_TYPE_LATEST
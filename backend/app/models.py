@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Text, Integer, DateTime, ForeignKey
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import BigInteger, Boolean, Column, String, Text, Integer, DateTime, ForeignKey, Index, LargeBinary, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 
 from .database import Base
@@ -32,12 +32,30 @@ class Game(Base):
     result = Column(String(20), nullable=True)
     difficulty = Column(Integer, nullable=False, default=3)  # 1-6, default Medium
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True, index=True)
+    # Packed move list (2 bytes per ply) and checkpoint FENs, see services.move_codec
+    move_data = Column(LargeBinary, nullable=False, default=b"")
+    checkpoints = Column(Text, nullable=False, default="")
+    # 8-byte Zobrist hashes since the last irreversible move, for threefold repetition
+    position_hashes = Column(LargeBinary, nullable=False, default=b"")
+    # Whether a finished game's moves have been added to explorer_moves
+    explorer_indexed = Column(Boolean, nullable=False, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     user = relationship("User", back_populates="games")
     moves = relationship("Move", back_populates="game", order_by="Move.move_number")
 
+    __table_args__ = (
+        # Keyset pagination of a user's history and incremental sync
+        Index("ix_games_user_id_created_at", user_id, created_at.desc(), id.desc()),
+        Index("ix_games_user_id_updated_at", user_id, updated_at, id),
+        # Finished games the explorer rebuild still has to index
+        Index(
+            "ix_games_explorer_pending", id,
+            postgresql_where=(status == "finished") & ~explorer_indexed,
+        ),
+    )
+
 
 class Move(Base):
     __tablename__ = "moves"
@@ -51,3 +69,47 @@ class Move(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
     game = relationship("Game", back_populates="moves")
+
+    __table_args__ = (
+        # One row per ply; also serves game.moves (WHERE game_id ORDER BY move_number)
+        UniqueConstraint("game_id", "move_number", name="uq_moves_game_id_move_number"),
+    )
+
+
+class AnalysisCacheEntry(Base):
+    __tablename__ = "analysis_cache"
+
+    # FEN without the move clocks, see services.move_cache.normalize_fen
+    fen_key = Column(String(100), primary_key=True)
+    depth = Column(Integer, nullable=False)
+    multipv = Column(Integer, nullable=False)
+    lines = Column(JSONB, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class ExplorerMove(Base):
+    __tablename__ = "explorer_moves"
+
+    # Polyglot Zobrist hash of the position the move was played from, as a
+    # signed 64-bit integer; the primary key makes a lookup one index range read
+    position_hash = Column(BigInteger, primary_key=True)
+    move = Column(String(5), primary_key=True)  # UCI
+    count = Column(Integer, nullable=False, default=0)
+    white_wins = Column(Integer, nullable=False, default=0)
+    draws = Column(Integer, nullable=False, default=0)
+    black_wins = Column(Integer, nullable=False, default=0)
+
+
+class GameReview(Base):
+    __tablename__ = "game_reviews"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    game_id = Column(UUID(as_uuid=True), ForeignKey("games.id"), nullable=False, unique=True, index=True)
+    status = Column(String(20), nullable=False, default="queued")  # queued, running, finished, failed
+    depth = Column(Integer, nullable=False)
+    annotations = Column(JSONB, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    # Last state change; a queued or running review idle for too long was lost
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
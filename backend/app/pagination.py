@@ -0,0 +1,21 @@
+import base64
+from datetime import datetime
+from uuid import UUID
+
+from fastapi import HTTPException
+
+
+def encode_cursor(timestamp: datetime, row_id: UUID) -> str:
+    """Encode a (timestamp, id) keyset position as an opaque URL-safe token."""
+    raw = f"{timestamp.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    """Decode a token from encode_cursor, raising 400 if it is malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, row_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        return datetime.fromisoformat(timestamp), UUID(row_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
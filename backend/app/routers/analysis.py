@@ -0,0 +1,72 @@
+import json
+
+import chess
+import chess.engine
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+
+from ..schemas import AnalysisRequest, AnalysisResponse
+from ..services.ai_service import ai, EnginePoolTimeout
+from ..services.analysis_cache import analysis_cache
+
+router = APIRouter(prefix="/analysis", tags=["analysis"])
+
+
+def _validate_fen(fen: str) -> None:
+    try:
+        board = chess.Board(fen)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Invalid FEN")
+    # Stockfish can crash or hang on positions that parse but are illegal
+    # (no king, pawns on the back rank, side not to move in check)
+    if not board.is_valid():
+        raise HTTPException(status_code=422, detail="Illegal position")
+
+
+@router.post("", response_model=AnalysisResponse)
+async def analyse_position(request: AnalysisRequest):
+    """Return the engine's top lines for a position at the requested depth."""
+    _validate_fen(request.fen)
+
+    result = await analysis_cache.get(request.fen, request.depth, request.multipv)
+    if result is None:
+        try:
+            result = await ai.analyse(request.fen, request.depth, request.multipv)
+        except EnginePoolTimeout:
+            raise HTTPException(status_code=503, detail="Engine busy, try again")
+        except chess.engine.EngineError as e:
+            print(f"Analysis failed: {e}")
+            raise HTTPException(status_code=503, detail="Engine unavailable, try again")
+        await analysis_cache.put(request.fen, result, request.multipv)
+
+    return AnalysisResponse(fen=request.fen, **result)
+
+
+@router.post("/stream")
+async def stream_analysis(request: AnalysisRequest):
+    """Server-sent events: one "depth" event per completed iteration, then "done"."""
+    _validate_fen(request.fen)
+
+    async def events():
+        cached = await analysis_cache.get(request.fen, request.depth, request.multipv)
+        if cached is not None:
+            yield f"event: depth\ndata: {json.dumps({'fen': request.fen, **cached})}\n\n"
+            yield f"event: done\ndata: {json.dumps({'fen': request.fen, **cached})}\n\n"
+            return
+
+        last = {"depth": 0, "lines": []}
+        try:
+            async for result in ai.analysis_stream(request.fen, request.depth, request.multipv):
+                last = result
+                yield f"event: depth\ndata: {json.dumps({'fen': request.fen, **result})}\n\n"
+        except EnginePoolTimeout:
+            yield f"event: error\ndata: {json.dumps({'detail': 'Engine busy, try again'})}\n\n"
+            return
+        except chess.engine.EngineError as e:
+            print(f"Analysis failed: {e}")
+            yield f"event: error\ndata: {json.dumps({'detail': 'Engine unavailable, try again'})}\n\n"
+            return
+        await analysis_cache.put(request.fen, last, request.multipv)
+        yield f"event: done\ndata: {json.dumps({'fen': request.fen, **last})}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
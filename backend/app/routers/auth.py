@@ -2,10 +2,10 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 
-from ..database import get_db
+from ..database import get_db, get_read_db
 from ..models import User
 from ..schemas import RegisterRequest
-from ..dependencies import get_current_user_required
+from ..dependencies import get_current_user_required, invalidate_cached_user
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -13,7 +13,7 @@ router = APIRouter(prefix="/auth", tags=["auth"])
 @router.get("/check-username")
 def check_username(
     username: str = Query(..., min_length=3, max_length=50, pattern="^[a-zA-Z0-9_-]+$"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Check if a username is available. Returns 200 if available, 409 if taken."""
     exists = db.query(User).filter(func.lower(User.username) == username.lower()).first()
@@ -25,7 +25,7 @@ def check_username(
 @router.get("/lookup-email")
 def lookup_email(
     username: str = Query(..., min_length=3),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Lookup email by username to facilitate username-based login."""
     user = db.query(User).filter(func.lower(User.username) == username.lower()).first()
@@ -59,5 +59,6 @@ def register_user(
     current_user.username = request.username
     db.commit()
     db.refresh(current_user)
+    invalidate_cached_user(current_user.firebase_uid)
 
     return {"status": "success", "username": current_user.username}
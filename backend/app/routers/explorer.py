@@ -0,0 +1,35 @@
+import chess
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from ..database import get_read_db
+from ..schemas import ExplorerMoveStats, ExplorerResponse
+from ..services import explorer
+
+router = APIRouter(prefix="/explorer", tags=["explorer"])
+
+
+@router.get("", response_model=ExplorerResponse)
+def explore_position(fen: str = Query(default=chess.STARTING_FEN), db: Session = Depends(get_read_db)):
+    """Moves played from a position across all finished games, most played first."""
+    try:
+        board, rows = explorer.lookup(db, fen)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Invalid FEN")
+
+    moves = []
+    for row in rows:
+        move = chess.Move.from_uci(row.move)
+        # Guards against a 64-bit hash collision with another position
+        if not board.is_legal(move):
+            continue
+        moves.append(ExplorerMoveStats(
+            move=row.move,
+            san=board.san(move),
+            count=row.count,
+            white_wins=row.white_wins,
+            draws=row.draws,
+            black_wins=row.black_wins,
+        ))
+
+    return ExplorerResponse(fen=fen, total=sum(move.count for move in moves), moves=moves)
@@ -0,0 +1,68 @@
+from datetime import datetime
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database import get_async_db
+from ..models import Game, GameReview
+from ..schemas import ReviewResponse
+from ..services.review_service import is_retryable, review_service
+
+router = APIRouter(prefix="/games/{game_id}/review", tags=["review"])
+
+
+def _to_response(review: GameReview) -> ReviewResponse:
+    return ReviewResponse(
+        game_id=review.game_id,
+        status=review.status,
+        depth=review.depth,
+        annotations=review.annotations,
+        error=review.error,
+    )
+
+
+@router.post("", response_model=ReviewResponse, status_code=202)
+async def request_review(game_id: UUID, db: AsyncSession = Depends(get_async_db)):
+    """Queue a full-game review.
+
+    Re-posting returns the existing job, unless it failed or was lost
+    (queued or running for longer than REVIEW_TIMEOUT), which requeues it.
+    """
+    game = await db.get(Game, game_id)
+    if not game:
+        raise HTTPException(status_code=404, detail="Game not found")
+    if game.status != "finished":
+        raise HTTPException(status_code=409, detail="Only finished games can be reviewed")
+
+    review = await db.scalar(select(GameReview).where(GameReview.game_id == game_id))
+    if review is not None and not is_retryable(review):
+        return _to_response(review)
+
+    if review is None:
+        review = GameReview(game_id=game_id, depth=review_service.depth)
+        db.add(review)
+    review.status = "queued"
+    review.annotations = None
+    review.error = None
+    review.updated_at = datetime.utcnow()
+    try:
+        await db.commit()
+    except IntegrityError:
+        # A concurrent request for the same game queued it first
+        await db.rollback()
+        review = await db.scalar(select(GameReview).where(GameReview.game_id == game_id))
+        return _to_response(review)
+
+    review_service.start(review.id, game_id)
+    return _to_response(review)
+
+
+@router.get("", response_model=ReviewResponse)
+async def get_review(game_id: UUID, db: AsyncSession = Depends(get_async_db)):
+    review = await db.scalar(select(GameReview).where(GameReview.game_id == game_id))
+    if review is None:
+        raise HTTPException(status_code=404, detail="Review not found")
+    return _to_response(review)
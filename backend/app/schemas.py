@@ -30,6 +30,7 @@ class GameResponse(BaseModel):
     current_position: str
     difficulty: int
     moves: list[MoveInfo] = []
+    move_count: int = 0
 
     class Config:
         from_attributes = True
@@ -65,6 +66,7 @@ class GameSummary(BaseModel):
     difficulty: int
     move_count: int
     created_at: str
+    updated_at: str
 
     class Config:
         from_attributes = True
@@ -73,6 +75,12 @@ class GameSummary(BaseModel):
 
 class UserGamesResponse(BaseModel):
     games: list[GameSummary]
+    next_cursor: str | None = None
+
+
+class PgnImportResponse(BaseModel):
+    imported: int
+    skipped: int  # Unparseable, unfinished, or not from the standard start position
 
 
 class TutorRequest(BaseModel):
@@ -88,3 +96,54 @@ class TutorRequest(BaseModel):
 class TutorResponse(BaseModel):
     explanation: str
 
+
+
+class AnalysisRequest(BaseModel):
+    fen: str
+    depth: int = Field(default=16, ge=1, le=30)
+    multipv: int = Field(default=3, ge=1, le=5)
+
+
+class AnalysisLine(BaseModel):
+    pv: list[str]
+    score_cp: int | None  # Centipawns from White's point of view
+    mate: int | None
+
+
+class AnalysisResponse(BaseModel):
+    fen: str
+    depth: int
+    lines: list[AnalysisLine]
+
+
+class MoveAnnotation(BaseModel):
+    move_number: int
+    move: str
+    san: str | None
+    eval_cp: int  # After the move, from White's point of view
+    best_move: str | None
+    cp_loss: int
+    label: str | None  # blunder, mistake, inaccuracy
+
+
+class ReviewResponse(BaseModel):
+    game_id: UUID
+    status: str
+    depth: int
+    annotations: list[MoveAnnotation] | None = None
+    error: str | None = None
+
+
+class ExplorerMoveStats(BaseModel):
+    move: str
+    san: str
+    count: int
+    white_wins: int
+    draws: int
+    black_wins: int
+
+
+class ExplorerResponse(BaseModel):
+    fen: str
+    total: int  # Games that reached this position within the indexed plies
+    moves: list[ExplorerMoveStats]
@@ -1,6 +1,16 @@
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from contextlib import asynccontextmanager
+
 import chess
 import chess.engine
 
+from ..metrics import ENGINE_QUEUE_DEPTH, ENGINE_QUEUE_WAIT_SECONDS, ENGINE_SHED, stage
+from .move_cache import ReplyCache
+
 # Map difficulty level (1-6) to Stockfish Skill Level (0-20)
 DIFFICULTY_TO_SKILL = {
     1: 1,   # Beginner (~800 ELO)
@@ -11,28 +21,431 @@ DIFFICULTY_TO_SKILL = {
     6: 16,  # Insane (~2200 ELO)
 }
 
-STOCKFISH_PATH = "/usr/games/stockfish"
+# How many distinct engine replies to sample per position before answering
+# from the reply cache; weak levels need variety, strong ones play the same move.
+# A position with fewer plausible replies than this is simply never cached
+DIFFICULTY_TO_REPLY_VARIANTS = {
+    1: 4,
+    2: 4,
+    3: 3,
+    4: 2,
+    5: 1,
+    6: 1,
+}
 
+# Search budget per difficulty. Below Skill Level 20 Stockfish commits to
+# its weakened choice once it completes depth Skill Level + 1, so searching
+# deeper only burns CPU; time stays as the latency ceiling for every level
+DIFFICULTY_TO_LIMIT = {
+    1: chess.engine.Limit(depth=2, time=0.1),
+    2: chess.engine.Limit(depth=4, time=0.1),
+    3: chess.engine.Limit(depth=7, time=0.1),
+    4: chess.engine.Limit(depth=11, time=0.1),
+    5: chess.engine.Limit(depth=14, time=0.1),
+    6: chess.engine.Limit(depth=17, time=0.1),
+}
+DEFAULT_LIMIT = chess.engine.Limit(time=0.1)
 
-class StockfishAI:
-    def select_move(self, fen: str, difficulty: int = 3) -> str | None:
-        skill_level = DIFFICULTY_TO_SKILL.get(difficulty, 10)
+# Cheaper search used while the engine queue is backed up. Levels 1-3
+# already stop at a shallow depth; stronger levels keep a larger share of
+# their normal budget
+DIFFICULTY_TO_SHED_LIMIT = {
+    1: chess.engine.Limit(depth=2, time=0.05),
+    2: chess.engine.Limit(depth=4, time=0.05),
+    3: chess.engine.Limit(depth=6, time=0.05),
+    4: chess.engine.Limit(depth=8, time=0.05),
+    5: chess.engine.Limit(depth=10, time=0.06),
+    6: chess.engine.Limit(depth=12, time=0.08),
+}
+
+# From this difficulty up a mate in one is always played, without the engine
+INSTANT_MATE_MIN_DIFFICULTY = 4
+
+STOCKFISH_PATH = os.getenv("STOCKFISH_PATH", "/usr/games/stockfish")
+
+# Number of long-lived Stockfish processes shared by all requests
+ENGINE_POOL_SIZE = int(os.getenv("ENGINE_POOL_SIZE", "2"))
+# "host:port,host:port" of engine workers (services.engine_worker); when set,
+# searches run there instead of in local Stockfish processes
+ENGINE_WORKERS = os.getenv("ENGINE_WORKERS", "")
+# Seconds a request waits for a free engine before giving up
+ENGINE_POOL_TIMEOUT = float(os.getenv("ENGINE_POOL_TIMEOUT", "5"))
+# Requests allowed to wait for an engine; moves beyond this are refused at once
+ENGINE_QUEUE_SIZE = int(os.getenv("ENGINE_QUEUE_SIZE", "32"))
+# From this many waiting requests, moves get the cheaper search and analysis is refused
+ENGINE_QUEUE_SHED = int(os.getenv("ENGINE_QUEUE_SHED", "8"))
+
+# Engine work by urgency, lowest served first. Pondering never queues: it
+# only takes an engine nobody is waiting for (AsyncEnginePool.try_checkout)
+PRIORITY_MOVE = 0      # a player is waiting for the computer's reply
+PRIORITY_ANALYSIS = 1  # on-demand analysis
+PRIORITY_NAMES = {PRIORITY_MOVE: "move", PRIORITY_ANALYSIS: "analysis"}
+
+# Analysis runs at full strength, bounded by depth and wall-clock time
+ANALYSIS_SKILL_LEVEL = 20
+ANALYSIS_MAX_TIME = float(os.getenv("ANALYSIS_MAX_TIME", "3"))
+
+ENGINE_OPTIONS = {
+    "Hash": 16,      # Limit hash table to 16 MB (default is 16, but be explicit)
+    "Threads": 1,    # Single thread to reduce memory usage
+}
+
+
+def instant_move(board: chess.Board, difficulty: int) -> chess.Move | None:
+    """A reply that needs no search: the only legal move, or (at higher levels) a mate in one."""
+    legal_moves = list(board.legal_moves)
+    if len(legal_moves) == 1:
+        return legal_moves[0]
+
+    if difficulty >= INSTANT_MATE_MIN_DIFFICULTY:
+        for move in legal_moves:
+            # gives_check is cheap and rules out almost every move
+            if board.gives_check(move):
+                board.push(move)
+                mate = board.is_checkmate()
+                board.pop()
+                if mate:
+                    return move
+    return None
+
+
+class EnginePoolTimeout(Exception):
+    """Raised when no engine becomes available within the pool timeout."""
+
+
+class EngineOverloaded(EnginePoolTimeout):
+    """Raised at once, instead of queueing, when the engine queue is full."""
+
+
+def analysis_line(info: chess.engine.InfoDict) -> dict:
+    """Convert one engine info dict into a JSON-friendly PV line (White's view)."""
+    score = info["score"].white()
+    return {
+        "pv": [move.uci() for move in info.get("pv", [])],
+        "score_cp": score.score(),
+        "mate": score.mate(),
+    }
+
+
+class AsyncPooledEngine:
+    """A long-lived Stockfish process (chess.engine.popen_uci) plus the state we last sent to it."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.transport: asyncio.SubprocessTransport | None = None
+        self.engine: chess.engine.UciProtocol | None = None
+        self.skill_level: int | None = None
+
+    async def ensure_started(self) -> chess.engine.UciProtocol:
+        if self.engine is None:
+            with stage("engine_spawn"):
+                self.transport, self.engine = await chess.engine.popen_uci(self.path)
+                await self.engine.configure(ENGINE_OPTIONS)
+            self.skill_level = None
+        return self.engine
+
+    async def set_skill_level(self, skill_level: int) -> None:
+        if self.skill_level != skill_level:
+            engine = await self.ensure_started()
+            await engine.configure({"Skill Level": skill_level})
+            self.skill_level = skill_level
+
+    async def close(self) -> None:
+        if self.engine is not None:
+            try:
+                await asyncio.wait_for(self.engine.quit(), timeout=1)
+            except Exception:
+                if self.transport is not None:
+                    self.transport.close()
+            self.engine = None
+            self.transport = None
+            self.skill_level = None
+
+
+class AsyncEnginePool:
+    """Bounded pool of Stockfish processes for use from the event loop.
+
+    Engines are started lazily on first checkout and reused afterwards, so
+    the fork/exec and UCI handshake happen once per process instead of once
+    per move. An engine that dies is discarded and respawned on next use.
+    Waiting for a free engine or for a search is an await, so a slow search
+    never occupies one of the server's worker threads. When every engine is
+    busy, requests wait in a bounded priority queue: moves before analysis,
+    and within a priority each fairness key (a user or a game) gets one
+    turn per round, so one client firing many requests cannot starve the
+    rest. A request that would push the queue past the limit for its
+    priority fails at once with EngineOverloaded instead of timing out later.
+    """
+
+    def __init__(
+        self,
+        path: str = STOCKFISH_PATH,
+        size: int = ENGINE_POOL_SIZE,
+        timeout: float = ENGINE_POOL_TIMEOUT,
+        queue_size: int = ENGINE_QUEUE_SIZE,
+        shed_at: int = ENGINE_QUEUE_SHED,
+        engines: list | None = None,
+    ):
+        self.path = path
+        # Prebuilt engines, e.g. connections to engine workers, replace local processes
+        if engines is not None:
+            size = len(engines)
+        self.size = size
+        self.timeout = timeout
+        self.queue_size = queue_size
+        self.shed_at = shed_at
+        # LIFO, so the most recently used (warm) engine is reused first
+        self._idle: list[AsyncPooledEngine] = engines if engines is not None else [AsyncPooledEngine(path) for _ in range(size)]
+        # Heap of (priority, round, sequence, future) for requests waiting for an engine
+        self._queue: list[tuple[int, int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        # Fairness key -> its requests in the queue; the next one joins that round
+        self._rounds: dict[object, int] = {}
+        self._waiting_by_priority = dict.fromkeys(PRIORITY_NAMES, 0)
+        # Requests blocked in checkout(); try_checkout() yields to them
+        self.waiting = 0
+
+    def queue_limit(self, priority: int) -> int:
+        # Analysis is optional work, so it is refused as soon as moves start queueing up
+        return self.queue_size if priority == PRIORITY_MOVE else self.shed_at
 
+    def shedding(self) -> bool:
+        """True while enough requests are queued that moves should search less."""
+        return self.waiting >= self.shed_at
+
+    def admit(self, priority: int = PRIORITY_MOVE) -> None:
+        """Raise EngineOverloaded if a request of this priority would be refused now."""
+        if not self._idle and self.waiting >= self.queue_limit(priority):
+            ENGINE_SHED.labels(PRIORITY_NAMES[priority], "rejected").inc()
+            raise EngineOverloaded(f"{self.waiting} requests already waiting for an engine")
+
+    async def _acquire(self, priority: int, key) -> AsyncPooledEngine:
+        name = PRIORITY_NAMES[priority]
+        if self._idle and not self._queue:
+            ENGINE_QUEUE_WAIT_SECONDS.labels(name).observe(0)
+            return self._idle.pop()
+
+        self.admit(priority)
+        round_ = self._rounds.get(key, 0) if key is not None else 0
+        future = asyncio.get_running_loop().create_future()
+        entry = (priority, round_, next(self._sequence), future)
+        heapq.heappush(self._queue, entry)
+        if key is not None:
+            self._rounds[key] = round_ + 1
+        self.waiting += 1
+        self._waiting_by_priority[priority] += 1
+        ENGINE_QUEUE_DEPTH.labels(name).inc()
+        started = time.perf_counter()
         try:
-            with chess.engine.SimpleEngine.popen_uci(STOCKFISH_PATH) as engine:
-                engine.configure({
-                    "Skill Level": skill_level,
-                    "Hash": 16,      # Limit hash table to 16 MB (default is 16, but be explicit)
-                    "Threads": 1,    # Single thread to reduce memory usage
-                })
-
-                board = chess.Board(fen)
-                if board.is_game_over():
-                    return None
+            with stage("engine_checkout"):
+                return await asyncio.wait_for(future, timeout=self.timeout)
+        except asyncio.TimeoutError:
+            raise EnginePoolTimeout(f"No engine available after {self.timeout}s")
+        finally:
+            # Timed out or cancelled before an engine was handed over
+            if entry in self._queue:
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+            if key is not None:
+                if self._rounds[key] <= 1:
+                    del self._rounds[key]
+                else:
+                    self._rounds[key] -= 1
+            self.waiting -= 1
+            self._waiting_by_priority[priority] -= 1
+            ENGINE_QUEUE_DEPTH.labels(name).dec()
+            ENGINE_QUEUE_WAIT_SECONDS.labels(name).observe(time.perf_counter() - started)
+
+    def _release(self, pooled: AsyncPooledEngine, failed: bool = False) -> None:
+        # Hand the engine straight to the first waiter, so a newcomer cannot jump the queue
+        while self._queue:
+            future = heapq.heappop(self._queue)[3]
+            if not future.done():
+                future.set_result(pooled)
+                return
+        if failed:
+            # Last in line, so a retry gets another engine (or another worker)
+            self._idle.insert(0, pooled)
+        else:
+            self._idle.append(pooled)
+
+    @asynccontextmanager
+    async def checkout(self, priority: int = PRIORITY_MOVE, key=None):
+        """Yield an engine; ``key`` identifies the user or game for fair queueing."""
+        pooled = await self._acquire(priority, key)
+        failed = False
+        try:
+            await pooled.ensure_started()
+            yield pooled
+        except (chess.engine.EngineTerminatedError, chess.engine.EngineError, asyncio.CancelledError):
+            # A cancelled search leaves the engine mid-"go", so drop it too
+            failed = True
+            await pooled.close()
+            raise
+        finally:
+            self._release(pooled, failed)
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "idle": len(self._idle),
+            "waiting": self.waiting,
+            "waiting_by_priority": {PRIORITY_NAMES[p]: n for p, n in self._waiting_by_priority.items()},
+            "queue_size": self.queue_size,
+            "shedding": self.shedding(),
+        }
+
+    @asynccontextmanager
+    async def try_checkout(self):
+        """Like checkout(), but yields None at once instead of waiting for a busy pool.
+
+        Also yields None while any checkout() is waiting, so background work
+        never takes an engine that was just released for a real request.
+        """
+        if self.waiting or not self._idle:
+            yield None
+            return
+        pooled = self._idle.pop()
+        failed = False
+        try:
+            await pooled.ensure_started()
+            yield pooled
+        except (chess.engine.EngineTerminatedError, chess.engine.EngineError, asyncio.CancelledError):
+            failed = True
+            await pooled.close()
+            raise
+        finally:
+            self._release(pooled, failed)
+
+    async def close(self) -> None:
+        while self._idle:
+            await self._idle.pop().close()
+
+
+class AsyncStockfishAI:
+    def __init__(self, pool: AsyncEnginePool | None = None, replies: ReplyCache | None = None):
+        self._pool = pool
+        self.replies = replies if replies is not None else ReplyCache()
+
+    @property
+    def pool(self) -> AsyncEnginePool:
+        if self._pool is None:
+            self._pool = AsyncEnginePool()
+        return self._pool
+
+    async def select_move(self, fen: str, difficulty: int = 3, game_id: object = None, user_id: object = None) -> str | None:
+        """The computer's reply, or None if the game is over.
 
-                # Use a short time limit - skill level controls strength
-                result = engine.play(board, chess.engine.Limit(time=0.1))
-                return result.move.uci() if result.move else None
-        except Exception as e:
-            print(f"Stockfish error: {e}")
+        ``user_id`` (else ``game_id``) is the fairness key in the engine queue.
+        Raises EnginePoolTimeout (EngineOverloaded when the queue is full) or
+        chess.engine.EngineError when no engine could make the move, so the
+        caller can refuse the request rather than leave the game unanswered.
+        """
+        skill_level = DIFFICULTY_TO_SKILL.get(difficulty, 10)
+
+        variants = DIFFICULTY_TO_REPLY_VARIANTS.get(difficulty, 1)
+
+        board = chess.Board(fen)
+        if board.is_game_over():
             return None
+
+        if cached := self.replies.lookup(board, difficulty, variants):
+            return cached
+
+        if forced := instant_move(board, difficulty):
+            return forced.uci()
+
+        shed = self.pool.shedding()
+        if shed:
+            ENGINE_SHED.labels(PRIORITY_NAMES[PRIORITY_MOVE], "cheaper").inc()
+            limit = DIFFICULTY_TO_SHED_LIMIT.get(difficulty, DEFAULT_LIMIT)
+        else:
+            limit = DIFFICULTY_TO_LIMIT.get(difficulty, DEFAULT_LIMIT)
+        key = user_id if user_id is not None else game_id
+        for attempt in range(2):
+            try:
+                async with self.pool.checkout(PRIORITY_MOVE, key) as pooled:
+                    await pooled.set_skill_level(skill_level)
+                    with stage("engine_search"):
+                        result = await pooled.engine.play(board, limit, game=game_id)
+                if not result.move:
+                    return None
+                # A shallower search can pick a weaker move; don't serve it again later
+                if not shed:
+                    self.replies.store(board, difficulty, result.move.uci(), variants)
+                return result.move.uci()
+            except chess.engine.EngineTerminatedError as e:
+                print(f"Stockfish terminated (attempt {attempt + 1}): {e}")
+                if attempt:
+                    raise
+
+    async def analyse(self, fen: str, depth: int, multipv: int = 1) -> dict:
+        """Analyse a position and return its top ``multipv`` lines."""
+        board = chess.Board(fen)
+        if board.is_game_over():
+            return {"depth": 0, "lines": []}
+
+        limit = chess.engine.Limit(depth=depth, time=ANALYSIS_MAX_TIME)
+        # One retry covers an engine that crashed between requests
+        for attempt in range(2):
+            try:
+                async with self.pool.checkout(PRIORITY_ANALYSIS) as pooled:
+                    await pooled.set_skill_level(ANALYSIS_SKILL_LEVEL)
+                    with stage("engine_analysis"):
+                        infos = await pooled.engine.analyse(board, limit, multipv=multipv)
+                break
+            except chess.engine.EngineTerminatedError as e:
+                print(f"Stockfish terminated during analysis (attempt {attempt + 1}): {e}")
+                if attempt:
+                    raise
+
+        lines = [analysis_line(info) for info in infos if "score" in info]
+        return {"depth": min((info.get("depth", 0) for info in infos), default=0), "lines": lines}
+
+    async def analysis_stream(self, fen: str, depth: int, multipv: int = 1):
+        """Yield {"depth", "lines"} each time the engine completes a deeper iteration."""
+        board = chess.Board(fen)
+        if board.is_game_over():
+            return
+
+        expected = min(multipv, board.legal_moves.count())
+        limit = chess.engine.Limit(depth=depth, time=ANALYSIS_MAX_TIME)
+        # Retry a crashed engine once, unless results were already sent
+        for attempt in range(2):
+            streamed = False
+            try:
+                async with self.pool.checkout(PRIORITY_ANALYSIS) as pooled:
+                    await pooled.set_skill_level(ANALYSIS_SKILL_LEVEL)
+                    with await pooled.engine.analysis(board, limit, multipv=multipv) as analysis:
+                        lines: dict[int, dict] = {}
+                        current_depth = 0
+                        async for info in analysis:
+                            if "pv" not in info or "score" not in info or "depth" not in info:
+                                continue
+                            if info["depth"] != current_depth:
+                                current_depth = info["depth"]
+                                lines = {}
+                            lines[info.get("multipv", 1)] = analysis_line(info)
+                            # Stockfish reports lines 1..N in order, so the last one closes the iteration
+                            if len(lines) == expected:
+                                streamed = True
+                                yield {"depth": current_depth, "lines": [lines[i] for i in sorted(lines)]}
+                return
+            except chess.engine.EngineTerminatedError as e:
+                print(f"Stockfish terminated during analysis (attempt {attempt + 1}): {e}")
+                if attempt or streamed:
+                    raise
+
+    async def close(self) -> None:
+        if self._pool is not None:
+            await self._pool.close()
+        self.replies.close()
+
+
+if ENGINE_WORKERS:
+    # Imported here: remote_engine builds on the classes above
+    from .remote_engine import RemoteStockfishAI
+
+    ai = RemoteStockfishAI()
+else:
+    ai = AsyncStockfishAI()
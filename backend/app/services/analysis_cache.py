@@ -0,0 +1,92 @@
+import os
+from datetime import datetime
+
+import chess
+from sqlalchemy import and_, or_
+from sqlalchemy.dialects.postgresql import insert
+
+from ..cache import LRUCache
+from ..database import AsyncSessionLocal
+from ..models import AnalysisCacheEntry
+from .move_cache import normalize_fen
+
+ANALYSIS_CACHE_SIZE = int(os.getenv("ANALYSIS_CACHE_SIZE", "5000"))
+
+
+def cache_key(fen: str) -> str:
+    # Through chess.Board so that equivalent FENs share a key: it orders the
+    # castling rights and drops an en passant square with no legal capture
+    return normalize_fen(chess.Board(fen).fen())
+
+
+def _satisfies(entry: dict, depth: int, multipv: int) -> bool:
+    # A deeper search with at least as many lines answers a shallower request
+    return entry["depth"] >= depth and entry["multipv"] >= multipv
+
+
+def _better(entry: dict, than: dict) -> bool:
+    # Deeper wins, then more lines; the table's upsert uses the same rule
+    return (entry["depth"], entry["multipv"]) > (than["depth"], than["multipv"])
+
+
+class AnalysisCache:
+    """Two-tier cache of engine analysis keyed by canonical, normalized FEN.
+
+    An in-process LRU sits in front of the analysis_cache table. The table
+    survives restarts and is shared by all replicas. Each position keeps only
+    its best result, meaning the deepest one, with the most lines as a
+    tie-break. Each lookup and write uses its own short session, so no
+    connection stays checked out while the engine searches or a stream runs.
+    """
+
+    def __init__(self, maxsize: int = ANALYSIS_CACHE_SIZE):
+        self.memory = LRUCache(maxsize)
+
+    async def get(self, fen: str, depth: int, multipv: int) -> dict | None:
+        key = cache_key(fen)
+        entry = self.memory.get(key)
+        if entry is None:
+            async with AsyncSessionLocal() as db:
+                row = await db.get(AnalysisCacheEntry, key)
+            if row is None:
+                return None
+            entry = {"depth": row.depth, "multipv": row.multipv, "lines": row.lines}
+            self.memory.set(key, entry)
+
+        if not _satisfies(entry, depth, multipv):
+            return None
+        return {"depth": entry["depth"], "lines": entry["lines"][:multipv]}
+
+    async def put(self, fen: str, result: dict, multipv: int) -> None:
+        if not result["lines"]:
+            return
+
+        key = cache_key(fen)
+        # Store the requested multipv: positions with fewer legal moves return fewer lines
+        entry = {"depth": result["depth"], "multipv": multipv, "lines": result["lines"]}
+        cached = self.memory.peek(key)
+        if cached is None or _better(entry, cached):
+            self.memory.set(key, entry)
+
+        stmt = insert(AnalysisCacheEntry).values(fen_key=key, updated_at=datetime.utcnow(), **entry)
+        excluded = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[AnalysisCacheEntry.fen_key],
+            set_={
+                "depth": excluded.depth,
+                "multipv": excluded.multipv,
+                "lines": excluded.lines,
+                "updated_at": excluded.updated_at,
+            },
+            # Never replace a better stored result with a worse one
+            where=or_(
+                AnalysisCacheEntry.depth < excluded.depth,
+                and_(AnalysisCacheEntry.depth == excluded.depth, AnalysisCacheEntry.multipv < excluded.multipv),
+            ),
+        )
+        async with AsyncSessionLocal() as db:
+            await db.execute(stmt)
+            await db.commit()
+
+
+analysis_cache = AnalysisCache()
@@ -1,15 +1,103 @@
+import os
+import struct
+
 import chess
+import chess.polyglot
+
+from ..cache import LRUCache
 
 STARTING_FEN = chess.STARTING_FEN
 
+# Parsed boards of recently played games, keyed by game id
+BOARD_CACHE_SIZE = int(os.getenv("BOARD_CACHE_SIZE", "1000"))
+
+# game id -> (fen, board); a board is only reused while its FEN still matches the game row
+board_cache = LRUCache(BOARD_CACHE_SIZE)
+
+_UNSET = object()
+
+
+_ZOBRIST_ARRAY = chess.polyglot.POLYGLOT_RANDOM_ARRAY
+_zobrist_hasher = chess.polyglot.ZobristHasher(_ZOBRIST_ARRAY)
+
+
+def zobrist_hash(board: chess.Board) -> int:
+    """Same value as chess.polyglot.zobrist_hash, about twice as fast.
+
+    Walks each piece bitboard instead of looking up the piece on every
+    occupied square; bulk PGN import hashes tens of positions per game.
+    """
+    value = 0
+    for pivot, mask in enumerate(board.occupied_co):
+        for index, pieces in enumerate((board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings)):
+            bb = pieces & mask
+            base = 128 * index + 64 * pivot
+            while bb:
+                square = bb.bit_length() - 1
+                value ^= _ZOBRIST_ARRAY[base + square]
+                bb ^= 1 << square
+    if board.turn == chess.WHITE:
+        value ^= _ZOBRIST_ARRAY[780]
+    return value ^ _zobrist_hasher.hash_castling(board) ^ _zobrist_hasher.hash_ep_square(board)
+
+
+def position_hash(board: chess.Board) -> bytes:
+    """8-byte Zobrist hash; covers pieces, side to move, castling rights and en passant."""
+    return struct.pack(">Q", zobrist_hash(board))
+
+
+def repetition_history(moves: list[chess.Move], start_fen: str = STARTING_FEN) -> bytes:
+    """Position hashes since the last irreversible move of a replayed game.
+
+    Earlier positions can never recur, so this is all repetition detection needs.
+    """
+    board = chess.Board(start_fen)
+    history = position_hash(board)
+    for move in moves:
+        irreversible = board.is_irreversible(move)
+        board.push(move)
+        history = position_hash(board) if irreversible else history + position_hash(board)
+    return history
+
+
+STARTING_HISTORY = repetition_history([])
+
 
 class ChessService:
-    def __init__(self, fen: str = STARTING_FEN):
-        self.board = chess.Board(fen)
+    def __init__(self, fen: str = STARTING_FEN, board: chess.Board | None = None, history: bytes = b""):
+        self.board = board if board is not None else chess.Board(fen)
+        # Game.position_hashes: one position_hash per ply since the last irreversible move
+        self.history = history or b""
+        self._fen = None
+        self._outcome = _UNSET
+
+    @classmethod
+    def for_game(cls, game_id, fen: str, history: bytes = b"") -> "ChessService":
+        """Reuse the cached board for a game, or parse ``fen`` if it is missing or stale.
+
+        The cached board is taken out of the cache, so concurrent requests for
+        the same game never share one; hand it back with ``release``.
+        """
+        entry = board_cache.get(game_id)
+        if entry is not None:
+            board_cache.pop(game_id)
+            cached_fen, board = entry
+            if cached_fen == fen:
+                return cls(board=board, history=history)
+        return cls(fen, history=history)
+
+    def release(self, game_id) -> None:
+        """Put the board back in the cache for the game's next request."""
+        # Repetition history is not kept, same as a board parsed from FEN
+        self.board.clear_stack()
+        board_cache.set(game_id, (self.fen, self.board))
 
     @property
     def fen(self) -> str:
-        return self.board.fen()
+        # Serializing is the most expensive step of a ply, so do it once per move
+        if self._fen is None:
+            self._fen = self.board.fen()
+        return self._fen
 
     @property
     def turn(self) -> str:
@@ -18,30 +106,82 @@ class ChessService:
     def is_legal_move(self, move_uci: str) -> bool:
         try:
             move = chess.Move.from_uci(move_uci)
-            return move in self.board.legal_moves
+            return self.board.is_legal(move)
         except ValueError:
             return False
 
+    def play(self, move_uci: str) -> str | None:
+        """Validate, play and score a move in one pass.
+
+        Returns the move's SAN, or None (board untouched) if it is illegal.
+        The outcome is computed once here and served by is_game_over/get_result;
+        besides board.outcome() it ends the game on threefold repetition,
+        using the position history rather than the board's move stack.
+        """
+        try:
+            move = chess.Move.from_uci(move_uci)
+        except ValueError:
+            return None
+        if not self.board.is_legal(move):
+            return None
+
+        irreversible = self.board.is_irreversible(move)
+        san = self.board.san_and_push(move)
+        self._fen = None
+        self._record_position(irreversible)
+        if san.endswith("#"):
+            # san_and_push already found the mate; skip outcome()'s second search
+            self._outcome = chess.Outcome(chess.Termination.CHECKMATE, not self.board.turn)
+        else:
+            self._outcome = self.board.outcome()
+            if self._outcome is None and self.repetitions() >= 3:
+                self._outcome = chess.Outcome(chess.Termination.THREEFOLD_REPETITION, None)
+        return san
+
     def make_move(self, move_uci: str) -> str:
         move = chess.Move.from_uci(move_uci)
-        san = self.board.san(move)
-        self.board.push(move)
+        irreversible = self.board.is_irreversible(move)
+        san = self.board.san_and_push(move)
+        self._record_position(irreversible)
+        self._fen = None
+        self._outcome = _UNSET
         return san
 
+    def _record_position(self, irreversible: bool) -> None:
+        key = position_hash(self.board)
+        self.history = key if irreversible else self.history + key
+
+    def repetitions(self) -> int:
+        """How often the current position occurred since the last irreversible move.
+
+        The history never spans more than the 75-move rule allows, so this is
+        a bounded scan, not a replay.
+        """
+        key = self.history[-8:]
+        if not key:
+            return 0
+        # Only every other ply has the same side to move
+        return sum(self.history[i:i + 8] == key for i in range(len(self.history) - 8, -1, -16))
+
     def get_legal_moves(self) -> list[str]:
         return [move.uci() for move in self.board.legal_moves]
 
+    def outcome(self) -> chess.Outcome | None:
+        if self._outcome is _UNSET:
+            self._outcome = self.board.outcome()
+        return self._outcome
+
     def is_game_over(self) -> bool:
-        return self.board.is_game_over()
+        return self.outcome() is not None
 
     def get_result(self) -> str | None:
-        if not self.board.is_game_over():
+        outcome = self.outcome()
+        if outcome is None:
             return None
 
-        if self.board.is_checkmate():
-            return "black_win" if self.board.turn == chess.WHITE else "white_win"
-
-        return "draw"
+        if outcome.winner is None:
+            return "draw"
+        return "white_win" if outcome.winner == chess.WHITE else "black_win"
 
     def is_check(self) -> bool:
         return self.board.is_check()
@@ -0,0 +1,111 @@
+"""Engine worker: runs Stockfish searches for API replicas over TCP.
+
+Workers hold the Stockfish processes, so engine CPU can scale on its own
+nodes; point the API at them with ENGINE_WORKERS (see services.remote_engine
+for the protocol). Each worker serves any number of connections from an
+AsyncEnginePool of --engines Stockfish processes (single-threaded, so
+about one per core). There is no authentication, so only listen on a
+private network.
+
+    python -m app.services.engine_worker --port 7001
+    python -m app.services.engine_worker --port 7001 --workers 4   # ports 7001-7004
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import signal
+
+import chess
+import chess.engine
+
+from .ai_service import STOCKFISH_PATH, AsyncEnginePool, analysis_line
+from .remote_engine import ENGINE_WORKER_TIMEOUT
+
+# Connections beyond the engine count wait in the pool; the API's queue
+# already bounds how many searches are in flight
+WORKER_QUEUE_SIZE = 1024
+
+
+async def run_request(pool: AsyncEnginePool, request: dict) -> dict:
+    board = chess.Board(request["fen"])
+    for move in request.get("moves", ()):
+        board.push_uci(move)
+    limit = chess.engine.Limit(**request["limit"])
+
+    async with pool.checkout() as pooled:
+        await pooled.set_skill_level(request["skill"])
+        if request["op"] == "play":
+            result = await pooled.engine.play(board, limit, game=request.get("game"))
+            return {"move": result.move.uci() if result.move else None}
+        if request["op"] == "analyse":
+            infos = await pooled.engine.analyse(board, limit, multipv=request.get("multipv", 1))
+            return {"infos": [{**analysis_line(info), "depth": info.get("depth", 0)} for info in infos if "score" in info]}
+    raise ValueError(f"Unknown op {request['op']!r}")
+
+
+async def handle_connection(pool: AsyncEnginePool, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        while line := await reader.readline():
+            try:
+                response = await run_request(pool, json.loads(line))
+            except Exception as e:
+                response = {"error": f"{type(e).__name__}: {e}"}
+            writer.write(json.dumps(response).encode() + b"\n")
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host: str, port: int, engines: int) -> None:
+    pool = AsyncEnginePool(STOCKFISH_PATH, size=engines, timeout=ENGINE_WORKER_TIMEOUT, queue_size=WORKER_QUEUE_SIZE)
+    server = await asyncio.start_server(lambda r, w: handle_connection(pool, r, w), host, port)
+    print(f"Engine worker listening on {host}:{port} with {engines} engine(s)")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await pool.close()
+
+
+def run_worker(host: str, port: int, engines: int) -> None:
+    try:
+        asyncio.run(serve(host, port, engines))
+    except KeyboardInterrupt:
+        pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve Stockfish searches to API replicas.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=7001)
+    parser.add_argument("--workers", type=int, default=1, help="worker processes, on consecutive ports")
+    parser.add_argument("--engines", type=int, default=1, help="Stockfish processes per worker")
+    args = parser.parse_args()
+
+    if args.workers == 1:
+        run_worker(args.host, args.port, args.engines)
+        return
+
+    ports = range(args.port, args.port + args.workers)
+    processes = [
+        multiprocessing.Process(target=run_worker, args=(args.host, port, args.engines), daemon=True)
+        for port in ports
+    ]
+    for process in processes:
+        process.start()
+    # Stop the workers too when the launcher is stopped (docker stop, kill)
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    print("ENGINE_WORKERS=" + ",".join(f"localhost:{port}" for port in ports), flush=True)
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""Opening explorer: what was played from a position, and how it scored.
+
+explorer_moves holds one row per (position, next move) with the number of
+games and their results, keyed by the position's Zobrist hash. Games are
+added once, when they finish (``index_game``, in the same transaction), and
+``rebuild`` catches up on every finished game not indexed yet, streaming
+them in chunks. Run it once after the migration, or with --reset to
+recount from scratch:
+
+    python -m app.services.explorer [--reset]
+"""
+import argparse
+import os
+import struct
+
+import chess
+from sqlalchemy import select, text, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..models import ExplorerMove, Game
+from .chess_service import STARTING_FEN, position_hash
+from .move_codec import unpack_moves
+
+# Plies of each game that are indexed; past the opening almost every position is unique
+EXPLORER_MAX_PLY = int(os.getenv("EXPLORER_MAX_PLY", "40"))
+# Games read and indexed per transaction by the rebuild job
+EXPLORER_REBUILD_CHUNK = int(os.getenv("EXPLORER_REBUILD_CHUNK", "500"))
+
+# Rows per INSERT; 6 parameters each stays under asyncpg's 32767 limit
+UPSERT_BATCH = 1000
+
+# Game.result -> position in a tally entry: [count, white wins, draws, black wins]
+RESULT_SLOTS = {"white_win": 1, "draw": 2, "black_win": 3}
+
+Tally = dict[tuple[int, str], list[int]]
+
+
+def explorer_key(board: chess.Board) -> int:
+    """The position's Zobrist hash as a signed 64-bit integer, for a BIGINT column."""
+    return struct.unpack(">q", position_hash(board))[0]
+
+
+def game_positions(move_data: bytes, max_ply: int = EXPLORER_MAX_PLY) -> list[tuple[int, str]]:
+    """(position key, UCI move) for each of a game's first ``max_ply`` plies."""
+    board = chess.Board(STARTING_FEN)
+    positions = []
+    for move in unpack_moves(move_data)[:max_ply]:
+        positions.append((explorer_key(board), move.uci()))
+        board.push(move)
+    return positions
+
+
+def tally_positions(tally: Tally, positions: list[tuple[int, str]], result: str | None) -> None:
+    """Add one game's (position, move) pairs to ``tally``."""
+    slot = RESULT_SLOTS.get(result)
+    for key in positions:
+        counts = tally.setdefault(key, [0, 0, 0, 0])
+        counts[0] += 1
+        if slot is not None:
+            counts[slot] += 1
+
+
+def tally_game(tally: Tally, move_data: bytes, result: str | None, max_ply: int = EXPLORER_MAX_PLY) -> None:
+    tally_positions(tally, game_positions(move_data, max_ply), result)
+
+
+def upsert_statements(tally: Tally) -> list:
+    """INSERT ... ON CONFLICT statements adding ``tally`` to explorer_moves.
+
+    Rows go in key order, so concurrent writers lock shared rows (the
+    popular opening moves) in the same order and cannot deadlock.
+    """
+    rows = [
+        {"position_hash": key, "move": move, "count": c, "white_wins": w, "draws": d, "black_wins": b}
+        for (key, move), (c, w, d, b) in sorted(tally.items())
+    ]
+    statements = []
+    for start in range(0, len(rows), UPSERT_BATCH):
+        stmt = insert(ExplorerMove).values(rows[start:start + UPSERT_BATCH])
+        excluded = stmt.excluded
+        statements.append(stmt.on_conflict_do_update(
+            index_elements=[ExplorerMove.position_hash, ExplorerMove.move],
+            set_={
+                "count": ExplorerMove.count + excluded.count,
+                "white_wins": ExplorerMove.white_wins + excluded.white_wins,
+                "draws": ExplorerMove.draws + excluded.draws,
+                "black_wins": ExplorerMove.black_wins + excluded.black_wins,
+            },
+        ))
+    return statements
+
+
+async def index_game(db: AsyncSession, game: Game) -> None:
+    """Add a game that just finished; the caller commits with the game itself."""
+    if game.explorer_indexed:
+        return
+    tally: Tally = {}
+    tally_game(tally, game.move_data, game.result)
+    for stmt in upsert_statements(tally):
+        await db.execute(stmt)
+    game.explorer_indexed = True
+
+
+def lookup(db: Session, fen: str) -> tuple[chess.Board, list[ExplorerMove]]:
+    """Moves played from ``fen``, most played first; one range read of the primary key."""
+    board = chess.Board(fen)
+    rows = db.scalars(
+        select(ExplorerMove)
+        .where(ExplorerMove.position_hash == explorer_key(board))
+        .order_by(ExplorerMove.count.desc())
+    ).all()
+    return board, rows
+
+
+def rebuild(db: Session, reset: bool = False, chunk_size: int = EXPLORER_REBUILD_CHUNK) -> int:
+    """Index every finished game not indexed yet, one chunk per transaction.
+
+    Safe to stop and rerun; games that finish meanwhile are indexed by
+    submit_move. Returns the number of games indexed.
+    """
+    if reset:
+        # TRUNCATE blocks concurrent index_game calls until the flags are cleared too
+        db.execute(text("TRUNCATE explorer_moves"))
+        db.execute(update(Game).where(Game.explorer_indexed).values(explorer_indexed=False))
+        db.commit()
+
+    indexed = 0
+    last_id = None
+    while True:
+        query = (
+            select(Game.id, Game.move_data, Game.result)
+            .where(Game.status == "finished", ~Game.explorer_indexed)
+            .order_by(Game.id)
+            .limit(chunk_size)
+            # A second rebuild running at the same time takes other games
+            .with_for_update(skip_locked=True)
+        )
+        if last_id is not None:
+            query = query.where(Game.id > last_id)
+        rows = db.execute(query).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        tally: Tally = {}
+        for row in rows:
+            tally_game(tally, row.move_data, row.result)
+        for stmt in upsert_statements(tally):
+            db.execute(stmt)
+        db.execute(update(Game).where(Game.id.in_([row.id for row in rows])).values(explorer_indexed=True))
+        db.commit()
+
+        indexed += len(rows)
+        print(f"Explorer: indexed {indexed} games")
+    return indexed
+
+
+def main() -> None:
+    from ..database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Index finished games into the opening explorer.")
+    parser.add_argument("--reset", action="store_true", help="clear the index and recount every game")
+    parser.add_argument("--chunk-size", type=int, default=EXPLORER_REBUILD_CHUNK)
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        rebuild(db, reset=args.reset, chunk_size=args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
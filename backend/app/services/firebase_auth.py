@@ -1,11 +1,19 @@
 import os
 import json
+import hashlib
 import firebase_admin
 from firebase_admin import auth, credentials
 
+from ..cache import LRUCache
+from ..metrics import stage
+
 # Initialize Firebase Admin SDK
 _firebase_app = None
 
+# Verified tokens kept until their own "exp" claim, keyed by a hash of the token
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+token_cache = LRUCache(TOKEN_CACHE_SIZE)
+
 
 def _get_credentials():
     """Get Firebase credentials from environment variable.
@@ -38,6 +46,9 @@ def initialize_firebase():
 def verify_token(token: str) -> dict:
     """Verify a Firebase ID token and return the decoded claims.
 
+    Successful verifications are cached until the token's expiry, so a client
+    reusing the same token skips the signature check on later requests.
+
     Args:
         token: The Firebase ID token to verify
 
@@ -49,5 +60,13 @@ def verify_token(token: str) -> dict:
         firebase_admin.auth.ExpiredIdTokenError: If token has expired
         firebase_admin.auth.RevokedIdTokenError: If token has been revoked
     """
+    key = hashlib.sha256(token.encode()).hexdigest()
+    decoded = token_cache.get(key)
+    if decoded is not None:
+        return decoded
+
     initialize_firebase()
-    return auth.verify_id_token(token)
+    with stage("auth_verify"):
+        decoded = auth.verify_id_token(token)
+    token_cache.set(key, decoded, expires_at=decoded["exp"])
+    return decoded
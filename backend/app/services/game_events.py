@@ -0,0 +1,221 @@
+"""Per-game event channel behind the /games/{id}/ws WebSocket.
+
+Events are published to a Broker, which hands every message to the
+GameHub of each replica; the hub then fans it out to that replica's local
+subscribers. Messages are serialized once per event, not per subscriber.
+"""
+import abc
+import asyncio
+import json
+import os
+from contextlib import asynccontextmanager
+from typing import Callable
+
+from sqlalchemy.engine import make_url
+
+# "memory" keeps events inside this process (single replica, tests);
+# "postgres" shares them between replicas over LISTEN/NOTIFY
+GAME_EVENTS_BROKER = os.getenv("GAME_EVENTS_BROKER", "memory")
+# Undelivered events buffered per subscriber before it is told to resync
+GAME_EVENTS_QUEUE_SIZE = int(os.getenv("GAME_EVENTS_QUEUE_SIZE", "100"))
+
+NOTIFY_CHANNEL = "game_events"
+
+# Seconds between attempts to re-establish a lost LISTEN connection, doubling up to the max
+LISTEN_RETRY_DELAY = 0.5
+LISTEN_RETRY_MAX_DELAY = 30.0
+
+# Sent instead of the dropped events to a subscriber that fell behind
+RESYNC_MESSAGE = json.dumps({"type": "resync"})
+
+Deliver = Callable[[str, str], None]
+# Called when events may have been missed, e.g. after the broker reconnected
+Resync = Callable[[], None]
+
+
+class Broker(abc.ABC):
+    """Carries (game id, message) pairs to the GameHub of every replica."""
+
+    @abc.abstractmethod
+    async def start(self, deliver: Deliver, resync: Resync) -> None:
+        ...
+
+    @abc.abstractmethod
+    async def publish(self, game_id: str, message: str) -> None:
+        ...
+
+    async def close(self) -> None:
+        pass
+
+
+class InMemoryBroker(Broker):
+    """Delivers straight to the local hub; for a single replica and for tests."""
+
+    def __init__(self):
+        self._deliver: Deliver | None = None
+
+    async def start(self, deliver: Deliver, resync: Resync) -> None:
+        self._deliver = deliver
+
+    async def publish(self, game_id: str, message: str) -> None:
+        if self._deliver is not None:
+            self._deliver(game_id, message)
+
+
+class PostgresBroker(Broker):
+    """Shares events between replicas with PostgreSQL LISTEN/NOTIFY.
+
+    One connection listens, a second one publishes. If the listening
+    connection drops, it is re-established in the background and local
+    subscribers are told to resync, since events sent in between are lost.
+    NOTIFY payloads are limited to 8000 bytes, which game events stay far
+    below.
+    """
+
+    def __init__(self, dsn: str):
+        self.dsn = dsn
+        self._deliver: Deliver | None = None
+        self._resync: Resync | None = None
+        self._listener = None
+        self._publisher = None
+        self._publish_lock = asyncio.Lock()
+        self._reconnect_task: asyncio.Task | None = None
+        self._closed = False
+
+    async def start(self, deliver: Deliver, resync: Resync) -> None:
+        import asyncpg
+
+        self._deliver = deliver
+        self._resync = resync
+        await self._listen()
+        self._publisher = await asyncpg.connect(self.dsn)
+
+    async def _listen(self) -> None:
+        import asyncpg
+
+        listener = await asyncpg.connect(self.dsn)
+        await listener.add_listener(NOTIFY_CHANNEL, self._on_notify)
+        listener.add_termination_listener(self._on_listener_lost)
+        self._listener = listener
+
+    def _on_listener_lost(self, connection) -> None:
+        # Also called by close(); only reconnect a connection we still use
+        if self._closed or connection is not self._listener or self._reconnect_task is not None:
+            return
+        print("Game event listener connection lost, reconnecting")
+        self._listener = None
+        self._reconnect_task = asyncio.get_running_loop().create_task(self._relisten())
+
+    async def _relisten(self) -> None:
+        delay = LISTEN_RETRY_DELAY
+        try:
+            while not self._closed:
+                try:
+                    await self._listen()
+                except Exception as e:
+                    print(f"Game event listener reconnect failed: {e}")
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, LISTEN_RETRY_MAX_DELAY)
+                    continue
+                self._resync()
+                return
+        finally:
+            self._reconnect_task = None
+
+    def _on_notify(self, connection, pid, channel, payload: str) -> None:
+        game_id, _, message = payload.partition(" ")
+        self._deliver(game_id, message)
+
+    async def publish(self, game_id: str, message: str) -> None:
+        import asyncpg
+
+        async with self._publish_lock:
+            try:
+                await self._publisher.execute("SELECT pg_notify($1, $2)", NOTIFY_CHANNEL, f"{game_id} {message}")
+            except (asyncpg.PostgresConnectionError, asyncpg.InterfaceError, OSError) as e:
+                # One reconnect; a lost event only costs subscribers a refresh
+                print(f"Game event publish failed, reconnecting: {e}")
+                self._publisher = await asyncpg.connect(self.dsn)
+                await self._publisher.execute("SELECT pg_notify($1, $2)", NOTIFY_CHANNEL, f"{game_id} {message}")
+
+    async def close(self) -> None:
+        self._closed = True
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+        for connection in (self._listener, self._publisher):
+            if connection is not None:
+                await connection.close()
+        self._listener = self._publisher = None
+
+
+def make_broker(kind: str = GAME_EVENTS_BROKER) -> Broker:
+    if kind == "postgres":
+        from ..database import DATABASE_URL
+
+        # asyncpg takes a plain postgresql:// DSN
+        dsn = make_url(DATABASE_URL).set(drivername="postgresql").render_as_string(hide_password=False)
+        return PostgresBroker(dsn)
+    return InMemoryBroker()
+
+
+class GameHub:
+    """In-process fan-out of game events to WebSocket subscribers."""
+
+    def __init__(self, broker: Broker | None = None, queue_size: int = GAME_EVENTS_QUEUE_SIZE):
+        self.broker = broker if broker is not None else make_broker()
+        self.queue_size = queue_size
+        self._subscribers: dict[str, set[asyncio.Queue]] = {}
+
+    async def start(self) -> None:
+        await self.broker.start(self._deliver, self._resync_all)
+
+    async def close(self) -> None:
+        await self.broker.close()
+
+    @asynccontextmanager
+    async def subscribe(self, game_id):
+        """Yield a queue of serialized events for one game until the block exits."""
+        key = str(game_id)
+        queue: asyncio.Queue[str] = asyncio.Queue(self.queue_size)
+        self._subscribers.setdefault(key, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            subscribers = self._subscribers.get(key)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[key]
+
+    async def publish(self, game_id, event: dict) -> None:
+        try:
+            await self.broker.publish(str(game_id), json.dumps(event))
+        except Exception as e:
+            # Events are best effort; the move itself is already committed
+            print(f"Game event publish failed: {e}")
+
+    def _deliver(self, game_id: str, message: str) -> None:
+        for queue in self._subscribers.get(game_id, ()):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Too slow to keep up: drop its backlog and ask it to refetch the game
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESYNC_MESSAGE)
+
+    def _resync_all(self) -> None:
+        # Events may have been missed; every subscriber refetches its game
+        for subscribers in self._subscribers.values():
+            for queue in subscribers:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESYNC_MESSAGE)
+
+    def subscriber_count(self, game_id=None) -> int:
+        if game_id is not None:
+            return len(self._subscribers.get(str(game_id), ()))
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+
+game_hub = GameHub()
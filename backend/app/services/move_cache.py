@@ -0,0 +1,88 @@
+import os
+import random
+
+import chess
+import chess.polyglot
+
+from ..cache import LRUCache
+
+# Max cached (position, difficulty) keys
+MOVE_CACHE_SIZE = int(os.getenv("MOVE_CACHE_SIZE", "10000"))
+# Only cache positions up to this full move number; later positions rarely repeat
+MOVE_CACHE_MAX_FULLMOVE = int(os.getenv("MOVE_CACHE_MAX_FULLMOVE", "10"))
+# Optional Polyglot .bin opening book, memory-mapped read-only
+OPENING_BOOK_PATH = os.getenv("OPENING_BOOK_PATH")
+
+
+def normalize_fen(fen: str) -> str:
+    """Strip the halfmove clock and fullmove number from a FEN.
+
+    Positions reached by different move orders then share one cache key.
+    """
+    return " ".join(fen.split()[:4])
+
+
+class ReplyCache:
+    """Computer replies that can be answered without running the engine.
+
+    Two sources are consulted in order: the opening book (if configured),
+    then an LRU cache of earlier engine replies keyed by
+    (normalized FEN, difficulty). ``variants`` controls diversity: the cache
+    only answers once it has sampled that many distinct engine replies for a
+    key and then picks one of them at random, and the book picks a weighted-random
+    entry instead of the top one.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = MOVE_CACHE_SIZE,
+        max_fullmove: int = MOVE_CACHE_MAX_FULLMOVE,
+        book_path: str | None = OPENING_BOOK_PATH,
+    ):
+        self.max_fullmove = max_fullmove
+        self.cache = LRUCache(maxsize)
+        self.book: chess.polyglot.MemoryMappedReader | None = None
+        if book_path:
+            try:
+                self.book = chess.polyglot.open_reader(book_path)
+            except OSError as e:
+                print(f"Could not open opening book {book_path}: {e}")
+
+    def _cacheable(self, board: chess.Board) -> bool:
+        return board.fullmove_number <= self.max_fullmove
+
+    def lookup(self, board: chess.Board, difficulty: int, variants: int = 1) -> str | None:
+        if self.book is not None:
+            try:
+                if variants > 1:
+                    entry = self.book.weighted_choice(board)
+                else:
+                    entry = self.book.find(board)
+                return entry.move.uci()
+            except IndexError:
+                pass
+
+        if not self._cacheable(board):
+            return None
+
+        samples = self.cache.get((normalize_fen(board.fen()), difficulty))
+        if samples is None or len(samples) < variants:
+            return None
+        return random.choice(samples)
+
+    def store(self, board: chess.Board, difficulty: int, move_uci: str, variants: int = 1) -> None:
+        if not self._cacheable(board):
+            return
+
+        key = (normalize_fen(board.fen()), difficulty)
+        samples = self.cache.peek(key) or ()
+        # Only distinct replies count towards ``variants``, so a repeated
+        # move cannot fill the sample and take away the variety
+        if len(samples) < variants and move_uci not in samples:
+            # Tuples are replaced, never mutated, so concurrent readers stay safe
+            self.cache.set(key, (*samples, move_uci))
+
+    def close(self) -> None:
+        if self.book is not None:
+            self.book.close()
+            self.book = None
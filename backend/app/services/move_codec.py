@@ -0,0 +1,91 @@
+"""Compact per-game move storage.
+
+Each move is packed into 2 bytes: 6 bits from-square, 6 bits to-square and
+3 bits promotion piece. A game's whole move list is stored in
+``Game.move_data``. ``Game.checkpoints`` holds a FEN every
+CHECKPOINT_INTERVAL plies, so any position can be rebuilt by replaying at
+most CHECKPOINT_INTERVAL - 1 moves from the nearest checkpoint.
+"""
+import os
+import struct
+
+import chess
+
+CHECKPOINT_INTERVAL = 20
+
+# "rows" also writes one moves row per ply (with SAN and FEN);
+# "compact" keeps only the packed move list on the games row.
+MOVE_STORAGE = os.getenv("MOVE_STORAGE", "rows")
+
+_PROMOTIONS = [None, chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN]
+
+
+def encode_move(move: chess.Move) -> bytes:
+    promotion = _PROMOTIONS.index(move.promotion)
+    return struct.pack(">H", move.from_square | move.to_square << 6 | promotion << 12)
+
+
+def decode_move(code: int) -> chess.Move:
+    return chess.Move(code & 0x3F, code >> 6 & 0x3F, _PROMOTIONS[code >> 12 & 0x7])
+
+
+def unpack_moves(data: bytes | None) -> list[chess.Move]:
+    if not data:
+        return []
+    return [decode_move(code) for (code,) in struct.iter_unpack(">H", data)]
+
+
+def pack_moves(moves: list[chess.Move]) -> bytes:
+    return b"".join(encode_move(move) for move in moves)
+
+
+def ply_count(data: bytes | None) -> int:
+    return len(data) // 2 if data else 0
+
+
+def append_move(data: bytes | None, checkpoints: str | None, move: chess.Move, board_after: chess.Board) -> tuple[bytes, str]:
+    """Append one move, adding a checkpoint FEN when the ply lands on the interval."""
+    data = (data or b"") + encode_move(move)
+    checkpoints = checkpoints or ""
+    if ply_count(data) % CHECKPOINT_INTERVAL == 0:
+        checkpoints += board_after.fen() + "\n"
+    return data, checkpoints
+
+
+def build_checkpoints(moves: list[chess.Move], start_fen: str = chess.STARTING_FEN) -> str:
+    board = chess.Board(start_fen)
+    fens = []
+    for ply, move in enumerate(moves, start=1):
+        board.push(move)
+        if ply % CHECKPOINT_INTERVAL == 0:
+            fens.append(board.fen() + "\n")
+    return "".join(fens)
+
+
+def position_at(data: bytes | None, checkpoints: str | None, ply: int, start_fen: str = chess.STARTING_FEN) -> chess.Board:
+    """Board after ``ply`` moves (0 = start), replayed from the nearest checkpoint."""
+    moves = unpack_moves(data)
+    if not 0 <= ply <= len(moves):
+        raise IndexError(f"ply {ply} out of range 0..{len(moves)}")
+
+    fens = checkpoints.splitlines() if checkpoints else []
+    index = min(ply // CHECKPOINT_INTERVAL, len(fens))
+    if index:
+        board = chess.Board(fens[index - 1])
+        start = index * CHECKPOINT_INTERVAL
+    else:
+        board = chess.Board(start_fen)
+        start = 0
+
+    for move in moves[start:ply]:
+        board.push(move)
+    return board
+
+
+def replay(data: bytes | None, start_fen: str = chess.STARTING_FEN):
+    """Yield (move, san, board) for every stored move; board is shared, so copy it to keep it."""
+    board = chess.Board(start_fen)
+    for move in unpack_moves(data):
+        san = board.san(move)
+        board.push(move)
+        yield move, san, board
@@ -0,0 +1,252 @@
+"""Bulk PGN export and import.
+
+Export streams a user's games from a server-side cursor, EXPORT_CHUNK rows
+at a time, and builds each game's movetext from the packed move list, so
+memory stays constant however many games there are. Import parses with a
+chess.pgn visitor that only collects main-line moves (no GameNode tree)
+and writes each IMPORT_BATCH games with one executemany per table.
+"""
+import os
+import uuid
+from datetime import datetime
+from typing import Iterator, TextIO
+
+import chess
+import chess.pgn
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from ..models import Game, Move
+from .chess_service import STARTING_FEN
+from .explorer import EXPLORER_MAX_PLY, Tally, explorer_key, tally_game, tally_positions, upsert_statements
+from .move_codec import CHECKPOINT_INTERVAL, MOVE_STORAGE, pack_moves, unpack_moves
+
+# Games fetched per round trip of the export cursor
+EXPORT_CHUNK = int(os.getenv("PGN_EXPORT_CHUNK", "500"))
+# Games inserted per transaction by the import
+IMPORT_BATCH = int(os.getenv("PGN_IMPORT_BATCH", "1000"))
+
+PGN_RESULTS = {"white_win": "1-0", "black_win": "0-1", "draw": "1/2-1/2"}
+GAME_RESULTS = {pgn: result for result, pgn in PGN_RESULTS.items()}
+
+# Export format line length
+PGN_COLUMNS = 79
+
+
+def _tag(name: str, value) -> str:
+    value = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'[{name} "{value}"]\n'
+
+
+def game_pgn(game, player: str) -> str:
+    """One game as PGN; ``game`` needs id, created_at, result, difficulty and move_data."""
+    result = PGN_RESULTS.get(game.result, "*")
+    date = game.created_at.strftime("%Y.%m.%d") if game.created_at else "????.??.??"
+    headers = (
+        _tag("Event", "Game vs computer")
+        + _tag("Site", "?")
+        + _tag("Date", date)
+        + _tag("Round", "-")
+        # The human always plays White
+        + _tag("White", player)
+        + _tag("Black", f"Stockfish level {game.difficulty}")
+        + _tag("Result", result)
+        + _tag("GameId", game.id)
+        + _tag("Difficulty", game.difficulty)
+    )
+
+    board = chess.Board(STARTING_FEN)
+    lines = []
+    line = ""
+    for ply, move in enumerate(unpack_moves(game.move_data)):
+        san = board.san_and_push(move)
+        token = f"{ply // 2 + 1}. {san}" if ply % 2 == 0 else san
+        if line and len(line) + 1 + len(token) > PGN_COLUMNS:
+            lines.append(line)
+            line = token
+        else:
+            line = f"{line} {token}" if line else token
+    if line and len(line) + 1 + len(result) > PGN_COLUMNS:
+        lines.append(line)
+        line = result
+    else:
+        line = f"{line} {result}" if line else result
+    lines.append(line)
+    return headers + "\n" + "\n".join(lines) + "\n\n"
+
+
+def export_games(db: Session, user_id, player: str, chunk_size: int = EXPORT_CHUNK) -> Iterator[str]:
+    """Yield the user's games as PGN text, one chunk of games per item, oldest first."""
+    result = db.execute(
+        select(Game.id, Game.created_at, Game.result, Game.difficulty, Game.move_data)
+        .where(Game.user_id == user_id, func.length(Game.move_data) > 0)
+        .order_by(Game.created_at, Game.id)
+        # Server-side cursor: only one chunk of rows is in memory at a time
+        .execution_options(yield_per=chunk_size)
+    )
+    for rows in result.partitions():
+        yield "".join(game_pgn(row, player) for row in rows)
+
+
+class ParsedGame:
+    __slots__ = ("headers", "moves", "board", "checkpoints", "positions", "error")
+
+    def __init__(self):
+        self.headers: dict[str, str] = {}
+        self.moves: list[chess.Move] = []
+        self.board: chess.Board | None = None
+        self.checkpoints: list[str] = []
+        # Explorer (position key, move) pairs, collected for games with a result
+        self.positions: list[tuple[int, str]] | None = None
+        self.error: str | None = None
+
+
+class MainLineVisitor(chess.pgn.BaseVisitor[ParsedGame]):
+    """Collects what an imported game row needs in the parser's single replay.
+
+    Main-line moves, checkpoint FENs and explorer positions are taken from
+    the parser's own board, so no game is replayed again. Variations and
+    games from other start positions are skipped.
+    """
+
+    def begin_game(self):
+        self.game = ParsedGame()
+
+    def visit_header(self, tagname: str, tagvalue: str) -> None:
+        self.game.headers[tagname] = tagvalue
+
+    def end_headers(self):
+        headers = self.game.headers
+        # Games always start from the standard position here
+        if headers.get("FEN", STARTING_FEN) != STARTING_FEN or headers.get("Variant", "standard").lower() not in ("standard", "chess"):
+            self.game.error = "unsupported start position or variant"
+            return chess.pgn.SKIP
+        if headers.get("Result") in GAME_RESULTS:
+            self.game.positions = []
+
+    def begin_variation(self):
+        return chess.pgn.SKIP
+
+    def visit_move(self, board: chess.Board, move: chess.Move) -> None:
+        game = self.game
+        if game.positions is not None and len(game.moves) < EXPLORER_MAX_PLY:
+            game.positions.append((explorer_key(board), move.uci()))
+        game.moves.append(move)
+
+    def visit_board(self, board: chess.Board) -> None:
+        self.game.board = board
+        ply = len(board.move_stack)
+        if ply and ply % CHECKPOINT_INTERVAL == 0:
+            self.game.checkpoints.append(board.fen() + "\n")
+
+    def handle_error(self, error: Exception) -> None:
+        if self.game.error is None:
+            self.game.error = str(error)
+
+    def result(self) -> ParsedGame:
+        return self.game
+
+
+def game_result(parsed: ParsedGame) -> str | None:
+    """The game's result from its Result header, else from the final position."""
+    result = GAME_RESULTS.get(parsed.headers.get("Result", "*"))
+    if result is None and (outcome := parsed.board.outcome(claim_draw=False)) is not None:
+        result = "draw" if outcome.winner is None else ("white_win" if outcome.winner else "black_win")
+    return result
+
+
+def _game_row(parsed: ParsedGame, result: str, user_id) -> dict:
+    headers = parsed.headers
+    board = parsed.board
+
+    try:
+        created_at = datetime.strptime(headers.get("Date", ""), "%Y.%m.%d")
+    except ValueError:
+        created_at = datetime.utcnow()
+    try:
+        difficulty = min(max(int(headers.get("Difficulty", "3")), 1), 6)
+    except ValueError:
+        difficulty = 3
+
+    return {
+        "id": uuid.uuid4(),
+        "status": "finished",
+        "current_position": board.fen(),
+        "turn": "white" if board.turn == chess.WHITE else "black",
+        "result": result,
+        "difficulty": difficulty,
+        "user_id": user_id,
+        "move_data": pack_moves(parsed.moves),
+        "checkpoints": "".join(parsed.checkpoints),
+        # Finished games can no longer repeat, see migration 0004
+        "position_hashes": b"",
+        "explorer_indexed": True,
+        "created_at": created_at,
+        "updated_at": datetime.utcnow(),
+    }
+
+
+def _move_rows(game_id, moves: list[chess.Move]) -> list[dict]:
+    board = chess.Board(STARTING_FEN)
+    rows = []
+    for move_number, move in enumerate(moves, start=1):
+        notation = board.san_and_push(move)
+        rows.append({
+            "game_id": game_id,
+            "move_number": move_number,
+            "move_input": move.uci(),
+            "move_notation": notation,
+            "position_after": board.fen(),
+        })
+    return rows
+
+
+def _flush(db: Session, games: list[dict], moves: list[dict], tally: Tally) -> None:
+    db.execute(insert(Game), games)
+    if moves:
+        db.execute(insert(Move), moves)
+    # Imported finished games go straight into the opening explorer
+    for stmt in upsert_statements(tally):
+        db.execute(stmt)
+    db.commit()
+
+
+def import_pgn(db: Session, handle: TextIO, user_id=None, batch_size: int = IMPORT_BATCH) -> dict:
+    """Import every finished game in a PGN stream; returns imported and skipped counts.
+
+    Unfinished games are skipped: they were not necessarily played with the
+    human as White against this engine, so they could not be continued.
+    """
+    imported = skipped = 0
+    games: list[dict] = []
+    moves: list[dict] = []
+    tally: Tally = {}
+
+    while (parsed := chess.pgn.read_game(handle, Visitor=MainLineVisitor)) is not None:
+        if parsed.error is not None or not parsed.moves:
+            skipped += 1
+            continue
+        result = game_result(parsed)
+        if result is None:
+            skipped += 1
+            continue
+
+        row = _game_row(parsed, result, user_id)
+        games.append(row)
+        if MOVE_STORAGE == "rows":
+            moves.extend(_move_rows(row["id"], parsed.moves))
+        if parsed.positions is not None:
+            tally_positions(tally, parsed.positions, result)
+        else:
+            # No result header, but the game ended on the board
+            tally_game(tally, row["move_data"], result)
+
+        if len(games) >= batch_size:
+            _flush(db, games, moves, tally)
+            imported += len(games)
+            games, moves, tally = [], [], {}
+
+    if games:
+        _flush(db, games, moves, tally)
+        imported += len(games)
+    return {"imported": imported, "skipped": skipped}
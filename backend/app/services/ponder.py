@@ -0,0 +1,185 @@
+import asyncio
+import os
+import time
+
+import chess
+import chess.engine
+
+from ..cache import LRUCache
+from .ai_service import (
+    ANALYSIS_SKILL_LEVEL,
+    DEFAULT_LIMIT,
+    DIFFICULTY_TO_LIMIT,
+    DIFFICULTY_TO_SKILL,
+    AsyncStockfishAI,
+    ai,
+    instant_move,
+)
+
+# Off by default: pondering trades spare engine CPU for lower move latency
+PONDER_ENABLED = os.getenv("PONDER_ENABLED", "false").lower() == "true"
+# Predicted human replies to precompute per position (PV move + alternatives)
+PONDER_REPLIES = int(os.getenv("PONDER_REPLIES", "3"))
+# Engine-seconds of speculation allowed per PONDER_BUDGET_WINDOW seconds, across all games
+PONDER_CPU_BUDGET = float(os.getenv("PONDER_CPU_BUDGET", "10"))
+PONDER_BUDGET_WINDOW = float(os.getenv("PONDER_BUDGET_WINDOW", "60"))
+# Games with pondered answers kept in memory
+PONDER_MAX_GAMES = int(os.getenv("PONDER_MAX_GAMES", "1000"))
+
+# Cheap full-strength search used only to guess what the human will play
+PREDICTION_LIMIT = chess.engine.Limit(depth=8, time=0.05)
+
+
+class SpeculationBudget:
+    """Token bucket of engine-seconds, refilled at PONDER_CPU_BUDGET per window."""
+
+    def __init__(self, seconds: float = PONDER_CPU_BUDGET, window: float = PONDER_BUDGET_WINDOW):
+        self.capacity = seconds
+        self.rate = seconds / window
+        self.available = seconds
+        self.spent = 0.0
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def allows(self) -> bool:
+        self._refill()
+        return self.available > 0
+
+    def charge(self, seconds: float) -> None:
+        # A search already running is allowed to finish, so the balance can dip below zero
+        self._refill()
+        self.available -= seconds
+        self.spent += seconds
+
+
+class PonderState:
+    """Precomputed answers for one game position, keyed by the human's reply."""
+
+    def __init__(self, fen: str):
+        self.fen = fen
+        self.answers: dict[str, str] = {}
+        self.cancelled = False
+
+
+class Ponderer:
+    """Precomputes the engine's answers to the human's likely replies.
+
+    After the computer moves, ``start`` guesses the human's best replies with
+    a short multi-PV search and runs the normal move search for each, while
+    the human is thinking. ``take`` hands back the stored answer if the
+    human played one of them. Speculation only ever uses an engine that is
+    idle at that moment, releases it between searches, and stops when the
+    shared CPU budget runs out, so it never delays a real request.
+    """
+
+    def __init__(self, engine: AsyncStockfishAI = ai, enabled: bool = PONDER_ENABLED, replies: int = PONDER_REPLIES):
+        self.engine = engine
+        self.enabled = enabled
+        self.replies = replies
+        self.budget = SpeculationBudget()
+        self._games = LRUCache(PONDER_MAX_GAMES)
+        # Strong references; the event loop only keeps weak ones
+        self._tasks: set[asyncio.Task] = set()
+        self.hits = 0
+        self.misses = 0
+
+    def start(self, game_id, fen: str, difficulty: int) -> None:
+        """Begin pondering the position the human now has to answer."""
+        if not self.enabled:
+            return
+        self._cancel(self._games.pop(game_id))
+        state = PonderState(fen)
+        task = asyncio.ensure_future(self._ponder(state, game_id, difficulty))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        self._games.set(game_id, state)
+
+    def take(self, game_id, fen: str, move_uci: str) -> str | None:
+        """Stop pondering this game and return the answer to ``move_uci``, if precomputed."""
+        state = self._games.pop(game_id)
+        if state is None:
+            return None
+        # Whatever is still running answers a different position or move
+        self._cancel(state)
+        answer = state.answers.get(move_uci) if state.fen == fen else None
+        if answer is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return answer
+
+    def _cancel(self, state: PonderState | None) -> None:
+        # A flag, not Task.cancel(): cancelling mid-search would kill the pooled
+        # engine, so the current search (bounded by its limit) runs to the end
+        if state is not None:
+            state.cancelled = True
+
+    async def _search(self, board: chess.Board, skill_level: int, limit: chess.engine.Limit, multipv: int | None = None, game=None):
+        """One search on an idle engine, charged to the budget. None if none is idle."""
+        async with self.engine.pool.try_checkout() as pooled:
+            if pooled is None:
+                return None
+            await pooled.set_skill_level(skill_level)
+            started = time.monotonic()
+            try:
+                if multipv is not None:
+                    return await pooled.engine.analyse(board, limit, multipv=multipv)
+                return await pooled.engine.play(board, limit, game=game)
+            finally:
+                self.budget.charge(time.monotonic() - started)
+
+    async def _ponder(self, state: PonderState, game_id, difficulty: int) -> None:
+        try:
+            board = chess.Board(state.fen)
+            if board.is_game_over() or not self.budget.allows():
+                return
+
+            infos = await self._search(board, ANALYSIS_SKILL_LEVEL, PREDICTION_LIMIT, multipv=self.replies)
+            if not infos:
+                return
+            predicted = [info["pv"][0] for info in infos if info.get("pv")]
+
+            skill_level = DIFFICULTY_TO_SKILL.get(difficulty, 10)
+            limit = DIFFICULTY_TO_LIMIT.get(difficulty, DEFAULT_LIMIT)
+            for reply in predicted:
+                if state.cancelled or not self.budget.allows():
+                    return
+                board.push(reply)
+                try:
+                    if board.is_game_over():
+                        continue
+                    if forced := instant_move(board, difficulty):
+                        state.answers[reply.uci()] = forced.uci()
+                        continue
+                    result = await self._search(board, skill_level, limit, game=game_id)
+                    if result is None:
+                        # Every engine is serving real requests
+                        return
+                    if result.move and not state.cancelled:
+                        state.answers[reply.uci()] = result.move.uci()
+                finally:
+                    board.pop()
+        except Exception as e:
+            print(f"Pondering failed: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "games": len(self._games),
+            "hits": self.hits,
+            "misses": self.misses,
+            "cpu_seconds": round(self.budget.spent, 3),
+        }
+
+    def close(self) -> None:
+        # Shutdown: the engines are about to be closed anyway
+        for task in self._tasks:
+            task.cancel()
+        self._games.clear()
+
+
+ponderer = Ponderer()
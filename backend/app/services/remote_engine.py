@@ -0,0 +1,170 @@
+"""Searches on engine workers (services.engine_worker) instead of local Stockfish.
+
+Each pool slot is one TCP connection to a worker carrying one search at a
+time, so the API-side AsyncEnginePool still does admission control,
+priorities and fairness, and pondering keeps using idle slots. Messages
+are JSON lines:
+
+    -> {"op": "play", "fen": ..., "moves": [...], "skill": 6, "limit": {"depth": 7, "time": 0.1}, "game": ...}
+    <- {"move": "e2e4"}
+    -> {"op": "analyse", ..., "multipv": 3}
+    <- {"infos": [{"depth": 16, "pv": [...], "score_cp": 25, "mate": null}, ...]}
+    <- {"error": "..."}
+"""
+import asyncio
+import json
+import os
+
+import chess
+import chess.engine
+
+from .ai_service import ENGINE_WORKERS, AsyncEnginePool, AsyncStockfishAI
+
+# Connections per worker, i.e. searches it runs at once; match the workers' --engines
+ENGINE_WORKER_SLOTS = int(os.getenv("ENGINE_WORKER_SLOTS", "1"))
+# Seconds to wait for a worker's answer; searches are bounded well below this
+ENGINE_WORKER_TIMEOUT = float(os.getenv("ENGINE_WORKER_TIMEOUT", "10"))
+
+LIMIT_FIELDS = ("depth", "time", "nodes")
+
+
+def parse_workers(spec: str) -> list[tuple[str, int]]:
+    addresses = []
+    for item in spec.split(","):
+        if item.strip():
+            host, _, port = item.strip().rpartition(":")
+            addresses.append((host or "localhost", int(port)))
+    return addresses
+
+
+def position_message(board: chess.Board) -> dict:
+    # Root position plus moves, so the worker's engine sees the game history
+    return {"fen": board.root().fen(), "moves": [move.uci() for move in board.move_stack]}
+
+
+def limit_message(limit: chess.engine.Limit) -> dict:
+    return {field: getattr(limit, field) for field in LIMIT_FIELDS if getattr(limit, field) is not None}
+
+
+def info_from_message(line: dict) -> chess.engine.InfoDict:
+    """Rebuild the InfoDict fields callers use from one analysis_line-style dict."""
+    if line.get("mate") is not None:
+        score = chess.engine.Mate(line["mate"])
+    else:
+        score = chess.engine.Cp(line["score_cp"])
+    return {
+        "depth": line["depth"],
+        "pv": [chess.Move.from_uci(move) for move in line["pv"]],
+        "score": chess.engine.PovScore(score, chess.WHITE),
+    }
+
+
+class RemoteEngine:
+    """The part of chess.engine.UciProtocol used by callers, served by a worker."""
+
+    def __init__(self, pooled: "RemotePooledEngine"):
+        self.pooled = pooled
+
+    async def play(self, board: chess.Board, limit: chess.engine.Limit, game: object = None) -> chess.engine.PlayResult:
+        response = await self.pooled.request({
+            "op": "play",
+            **position_message(board),
+            "skill": self.pooled.skill_level,
+            "limit": limit_message(limit),
+            "game": str(game) if game is not None else None,
+        })
+        move = response["move"]
+        return chess.engine.PlayResult(chess.Move.from_uci(move) if move else None, None)
+
+    async def analyse(self, board: chess.Board, limit: chess.engine.Limit, multipv: int | None = None) -> list[chess.engine.InfoDict]:
+        response = await self.pooled.request({
+            "op": "analyse",
+            **position_message(board),
+            "skill": self.pooled.skill_level,
+            "limit": limit_message(limit),
+            "multipv": multipv or 1,
+        })
+        return [info_from_message(line) for line in response["infos"]]
+
+
+class RemotePooledEngine:
+    """One connection to an engine worker; same interface as AsyncPooledEngine.
+
+    Connection problems raise EngineTerminatedError, so the pool drops the
+    connection (reconnecting on next use) and select_move retries on
+    another slot, exactly as for a crashed local engine.
+    """
+
+    def __init__(self, host: str, port: int, timeout: float = ENGINE_WORKER_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.engine: RemoteEngine | None = None
+        self.skill_level: int | None = None
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+
+    async def ensure_started(self) -> RemoteEngine:
+        if self.engine is None:
+            try:
+                self._reader, self._writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port), timeout=self.timeout,
+                )
+            except (OSError, asyncio.TimeoutError) as e:
+                raise chess.engine.EngineTerminatedError(f"Engine worker {self.host}:{self.port} unreachable: {e}")
+            self.engine = RemoteEngine(self)
+        return self.engine
+
+    async def set_skill_level(self, skill_level: int) -> None:
+        # Sent along with every search; the worker only reconfigures on change
+        self.skill_level = skill_level
+
+    async def request(self, message: dict) -> dict:
+        try:
+            self._writer.write(json.dumps(message).encode() + b"\n")
+            await self._writer.drain()
+            line = await asyncio.wait_for(self._reader.readline(), timeout=self.timeout)
+        except (OSError, asyncio.TimeoutError) as e:
+            raise chess.engine.EngineTerminatedError(f"Engine worker {self.host}:{self.port} failed: {e!r}")
+        if not line:
+            raise chess.engine.EngineTerminatedError(f"Engine worker {self.host}:{self.port} closed the connection")
+        response = json.loads(line)
+        if "error" in response:
+            raise chess.engine.EngineError(response["error"])
+        return response
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except OSError:
+                pass
+        self._reader = self._writer = None
+        self.engine = None
+        self.skill_level = None
+
+
+def remote_pool(workers: str = ENGINE_WORKERS, slots: int = ENGINE_WORKER_SLOTS) -> AsyncEnginePool:
+    # Interleave workers, so a partly idle pool spreads searches across them
+    engines = [RemotePooledEngine(host, port) for _ in range(slots) for host, port in parse_workers(workers)]
+    return AsyncEnginePool(engines=engines)
+
+
+class RemoteStockfishAI(AsyncStockfishAI):
+    """AsyncStockfishAI whose searches run on engine workers.
+
+    Same select_move and analyse interface. analysis_stream yields only the
+    final result, as workers answer each request with a single message.
+    """
+
+    @property
+    def pool(self) -> AsyncEnginePool:
+        if self._pool is None:
+            self._pool = remote_pool()
+        return self._pool
+
+    async def analysis_stream(self, fen: str, depth: int, multipv: int = 1):
+        result = await self.analyse(fen, depth, multipv)
+        if result["lines"]:
+            yield result
@@ -0,0 +1,155 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from uuid import UUID
+
+from sqlalchemy import select
+
+from ..database import AsyncSessionLocal
+from ..models import Game, GameReview
+from .ai_service import ANALYSIS_SKILL_LEVEL, ENGINE_OPTIONS, STOCKFISH_PATH
+from .chess_service import STARTING_FEN
+from .move_codec import replay
+from .review_worker import evaluate_positions, init_worker
+
+# Worker processes, each holding one warm Stockfish; roughly one per core
+REVIEW_POOL_SIZE = int(os.getenv("REVIEW_POOL_SIZE", str(max(1, (os.cpu_count() or 2) // 2))))
+REVIEW_DEPTH = int(os.getenv("REVIEW_DEPTH", "14"))
+# Consecutive positions sent to one worker together, so its hash stays warm
+REVIEW_BATCH_SIZE = int(os.getenv("REVIEW_BATCH_SIZE", "40"))
+# Seconds after which a review still queued or running is presumed lost
+# (e.g. to a restart) and may be requested again; keep it above the longest review
+REVIEW_TIMEOUT = int(os.getenv("REVIEW_TIMEOUT", "900"))
+
+# Centipawn loss thresholds, checked from most to least severe
+CP_LOSS_LABELS = [
+    (300, "blunder"),
+    (100, "mistake"),
+    (50, "inaccuracy"),
+]
+
+
+def classify(cp_loss: int) -> str | None:
+    for threshold, label in CP_LOSS_LABELS:
+        if cp_loss >= threshold:
+            return label
+    return None
+
+
+def annotate(moves: list[tuple[str, str]], evals: list[dict]) -> list[dict]:
+    """Turn per-position evals into per-move annotations.
+
+    ``moves`` holds (uci, san) per ply. ``evals[i]`` is the evaluation before
+    move i and ``evals[i + 1]`` the one after it, both from White's point of
+    view.
+    """
+    annotations = []
+    for i, (uci, san) in enumerate(moves):
+        move_number = i + 1
+        before, after = evals[i]["eval_cp"], evals[i + 1]["eval_cp"]
+        # Odd move numbers are White's
+        sign = 1 if move_number % 2 == 1 else -1
+        cp_loss = max(0, sign * (before - after))
+        annotations.append({
+            "move_number": move_number,
+            "move": uci,
+            "san": san,
+            "eval_cp": after,
+            "best_move": evals[i]["best_move"],
+            "cp_loss": cp_loss,
+            "label": classify(cp_loss),
+        })
+    return annotations
+
+
+def is_retryable(review: GameReview, now: datetime | None = None) -> bool:
+    """True if the review failed, or was queued or running for longer than REVIEW_TIMEOUT."""
+    if review.status == "failed":
+        return True
+    if review.status == "finished":
+        return False
+    changed = review.updated_at or review.created_at
+    return changed is None or (now or datetime.utcnow()) - changed > timedelta(seconds=REVIEW_TIMEOUT)
+
+
+class ReviewService:
+    """Runs full-game reviews as background jobs on a process pool.
+
+    Job state lives in the game_reviews table, so any replica can report it.
+    """
+
+    def __init__(self, pool_size: int = REVIEW_POOL_SIZE, depth: int = REVIEW_DEPTH, batch_size: int = REVIEW_BATCH_SIZE):
+        self.pool_size = pool_size
+        self.depth = depth
+        self.batch_size = batch_size
+        self._executor: ProcessPoolExecutor | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            options = {**ENGINE_OPTIONS, "Skill Level": ANALYSIS_SKILL_LEVEL}
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.pool_size,
+                # spawn: never fork a process that is running an event loop
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_worker,
+                initargs=(STOCKFISH_PATH, options),
+            )
+        return self._executor
+
+    def start(self, review_id: UUID, game_id: UUID) -> None:
+        task = asyncio.create_task(self._run(review_id, game_id))
+        # Keep a reference so the task isn't garbage collected mid-run
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _evaluate(self, fens: list[str], game_key: str) -> list[dict]:
+        loop = asyncio.get_running_loop()
+        executor = self.executor
+        batches = [fens[i:i + self.batch_size] for i in range(0, len(fens), self.batch_size)]
+        try:
+            results = await asyncio.gather(*(
+                loop.run_in_executor(executor, evaluate_positions, batch, self.depth, game_key)
+                for batch in batches
+            ))
+        except BrokenProcessPool:
+            # A worker died (e.g. Stockfish failed to start); a broken pool
+            # refuses all later work, so the next review starts a fresh one
+            if self._executor is executor:
+                self.close()
+            raise
+        return [evaluation for batch in results for evaluation in batch]
+
+    async def _run(self, review_id: UUID, game_id: UUID) -> None:
+        async with AsyncSessionLocal() as db:
+            review = await db.get(GameReview, review_id)
+            review.status = "running"
+            move_data = await db.scalar(select(Game.move_data).where(Game.id == game_id))
+            await db.commit()
+
+            try:
+                moves, fens = [], [STARTING_FEN]
+                for move, san, board in replay(move_data):
+                    moves.append((move.uci(), san))
+                    fens.append(board.fen())
+                evals = await self._evaluate(fens, str(game_id))
+                review.annotations = annotate(moves, evals)
+                review.status = "finished"
+            except Exception as e:
+                print(f"Review of game {game_id} failed: {e}")
+                review.status = "failed"
+                review.error = str(e)
+            review.finished_at = datetime.utcnow()
+            await db.commit()
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+review_service = ReviewService()
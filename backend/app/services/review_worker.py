@@ -0,0 +1,76 @@
+"""Code that runs inside review worker processes.
+
+Kept free of app imports (database, models) so spawned workers start fast
+and never open DB connections.
+"""
+from multiprocessing import util
+
+import chess
+import chess.engine
+
+# Evaluations are clamped so a found mate doesn't dwarf every other swing
+EVAL_CAP = 1000
+MATE_SCORE = 10000
+
+_engine: chess.engine.SimpleEngine | None = None
+_engine_path: str | None = None
+_engine_options: dict = {}
+
+
+def init_worker(path: str, options: dict) -> None:
+    """Process-pool initializer: start one warm Stockfish per worker."""
+    global _engine_path, _engine_options
+    _engine_path = path
+    _engine_options = options
+    _get_engine()
+    # SimpleEngine runs a non-daemon thread, which would block interpreter
+    # exit before atexit hooks run; multiprocessing finalizers run earlier.
+    util.Finalize(None, _quit_engine, exitpriority=10)
+
+
+def _quit_engine() -> None:
+    if _engine is not None:
+        _engine.quit()
+
+
+def _get_engine() -> chess.engine.SimpleEngine:
+    global _engine
+    if _engine is None:
+        _engine = chess.engine.SimpleEngine.popen_uci(_engine_path)
+        _engine.configure(_engine_options)
+    return _engine
+
+
+def evaluate_positions(fens: list[str], depth: int, game_key: str) -> list[dict]:
+    """Evaluate consecutive positions of one game on this worker's engine.
+
+    All positions share the same ``game`` key, so no ucinewgame is sent
+    between plies and the hash table carries over from one ply to the next.
+    """
+    global _engine
+    results = []
+    for fen in fens:
+        board = chess.Board(fen)
+        if board.is_game_over():
+            outcome = board.outcome()
+            if outcome.winner is None:
+                cp = 0
+            else:
+                cp = EVAL_CAP if outcome.winner == chess.WHITE else -EVAL_CAP
+            results.append({"eval_cp": cp, "best_move": None})
+            continue
+
+        try:
+            info = _get_engine().analyse(board, chess.engine.Limit(depth=depth), game=game_key)
+        except chess.engine.EngineTerminatedError:
+            # Respawn once; the hash is lost but the review can continue
+            _engine = None
+            info = _get_engine().analyse(board, chess.engine.Limit(depth=depth), game=game_key)
+
+        cp = info["score"].white().score(mate_score=MATE_SCORE)
+        pv = info.get("pv") or []
+        results.append({
+            "eval_cp": max(-EVAL_CAP, min(EVAL_CAP, cp)),
+            "best_move": pv[0].uci() if pv else None,
+        })
+    return results
@@ -1,9 +1,39 @@
 import os
+import json
+import time
+import asyncio
+import hashlib
 import google.generativeai as genai
 from .chess_service import ChessService
+from ..cache import LRUCache
+from ..metrics import record_stage, stage
+
+TUTOR_CACHE_SIZE = int(os.getenv("TUTOR_CACHE_SIZE", "5000"))
+TUTOR_CACHE_TTL = float(os.getenv("TUTOR_CACHE_TTL", "86400"))
+# Upper bound on a whole streamed explanation, in seconds
+TUTOR_STREAM_TIMEOUT = float(os.getenv("TUTOR_STREAM_TIMEOUT", "30"))
+
+
+def explanation_key(**inputs) -> str:
+    """Canonical hash of the prompt inputs; argument order and None vs missing don't matter."""
+    canonical = json.dumps({k: v for k, v in inputs.items() if v is not None}, sort_keys=True)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
 
 class TutorService:
-    def __init__(self):
+    def __init__(self, model=None):
+        """
+        Args:
+            model: Optional object with an async ``generate_content_async(prompt)``,
+                used instead of Gemini (e.g. a local fake in tests).
+        """
+        self.cache = LRUCache(TUTOR_CACHE_SIZE, ttl=TUTOR_CACHE_TTL)
+        self._inflight: dict[str, asyncio.Task] = {}
+
+        if model is not None:
+            self.model = model
+            return
+
         api_key = os.environ.get("GEMINI_API_KEY")
         if not api_key:
             print("Warning: GEMINI_API_KEY not found in environment variables.")
@@ -14,13 +44,7 @@ class TutorService:
             # 2026 Update: gemini-1.5 is deprecated. Using Gemini 3.
             self.model = genai.GenerativeModel('gemini-3-flash-preview')
 
-    async def explain_move(self, fen: str, move_uci: str, best_move_uci: str | None = None, player_pv: str | None = None, best_pv: str | None = None, alternative_move: str | None = None, alternative_pv: str | None = None) -> str:
-        """
-        Generates a natural language explanation for a chess move using Gemini.
-        """
-        if not hasattr(self, 'model'):
-             return "AI Tutor is not configured (Missing API Key)."
-
+    def _build_prompt(self, fen: str, move_uci: str, best_move_uci: str | None = None, player_pv: str | None = None, best_pv: str | None = None, alternative_move: str | None = None, alternative_pv: str | None = None) -> str:
         import chess
         board = chess.Board(fen)
         turn = "White" if board.turn == chess.WHITE else "Black"
@@ -56,15 +80,118 @@ class TutorService:
         3. Do NOT use markdown.
         4. Focus on ONE key idea (e.g. controlling center, safety, tactics).
         """
+        return prompt
+
+    async def _generate(self, prompt: str) -> tuple[str, bool]:
+        """Call the model once. Returns (text, ok); failures are not cached."""
+        try:
+            with stage("tutor_upstream"):
+                response = await self.model.generate_content_async(prompt)
+            return response.text, True
+        except Exception as e:
+            error_str = str(e)
+            print(f"Gemini API Error: {error_str}")
+            if "429" in error_str:
+                return "📉 Usage limit reached. Please wait a minute before asking again.", False
+            return "I couldn't generate an explanation right now.", False
+
+    async def explain_move(self, fen: str, move_uci: str, best_move_uci: str | None = None, player_pv: str | None = None, best_pv: str | None = None, alternative_move: str | None = None, alternative_pv: str | None = None) -> str:
+        """
+        Generates a natural language explanation for a chess move using Gemini.
+
+        Explanations are cached by a hash of the inputs, and concurrent
+        identical requests share a single upstream call.
+        """
+        if not hasattr(self, 'model'):
+             return "AI Tutor is not configured (Missing API Key)."
+
+        inputs = dict(fen=fen, move_uci=move_uci, best_move_uci=best_move_uci, player_pv=player_pv, best_pv=best_pv, alternative_move=alternative_move, alternative_pv=alternative_pv)
+        key = explanation_key(**inputs)
+
+        if (cached := self.cache.get(key)) is not None:
+            return cached
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(key, inputs))
+            self._inflight[key] = task
+        # shield: a caller that disconnects must not cancel the shared call
+        return await asyncio.shield(task)
 
+    async def _fetch(self, key: str, inputs: dict) -> str:
+        """The single upstream call behind all concurrent identical requests."""
         try:
-            response = await self.model.generate_content_async(prompt)
-            return response.text
+            text, ok = await self._generate(self._build_prompt(**inputs))
+            if ok:
+                self.cache.set(key, text)
+            return text
+        finally:
+            del self._inflight[key]
+
+    async def explain_move_stream(self, fen: str, move_uci: str, best_move_uci: str | None = None, player_pv: str | None = None, best_pv: str | None = None, alternative_move: str | None = None, alternative_pv: str | None = None):
+        """
+        Streaming variant of explain_move: yields text chunks as Gemini produces them.
+
+        The upstream stream is closed as soon as the consumer stops iterating
+        (e.g. the client disconnected) or TUTOR_STREAM_TIMEOUT elapses.
+        """
+        if not hasattr(self, 'model'):
+             yield "AI Tutor is not configured (Missing API Key)."
+             return
+
+        inputs = dict(fen=fen, move_uci=move_uci, best_move_uci=best_move_uci, player_pv=player_pv, best_pv=best_pv, alternative_move=alternative_move, alternative_pv=alternative_pv)
+        key = explanation_key(**inputs)
+
+        if (cached := self.cache.get(key)) is not None:
+            yield cached
+            return
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + TUTOR_STREAM_TIMEOUT
+        chunks = None
+        parts = []
+        # Only time spent waiting on Gemini, not on the client reading chunks
+        upstream_seconds = 0.0
+        try:
+            started = time.perf_counter()
+            try:
+                response = await asyncio.wait_for(
+                    self.model.generate_content_async(self._build_prompt(**inputs), stream=True),
+                    timeout=TUTOR_STREAM_TIMEOUT,
+                )
+            finally:
+                upstream_seconds += time.perf_counter() - started
+            chunks = response.__aiter__()
+            while True:
+                started = time.perf_counter()
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), timeout=deadline - loop.time())
+                except StopAsyncIteration:
+                    break
+                finally:
+                    upstream_seconds += time.perf_counter() - started
+                if chunk.text:
+                    parts.append(chunk.text)
+                    yield chunk.text
+        except asyncio.TimeoutError:
+            print("Gemini stream timed out")
+            if not parts:
+                yield "I couldn't generate an explanation right now."
+            return
         except Exception as e:
             error_str = str(e)
             print(f"Gemini API Error: {error_str}")
             if "429" in error_str:
-                return "📉 Usage limit reached. Please wait a minute before asking again."
-            return "I couldn't generate an explanation right now."
+                yield "📉 Usage limit reached. Please wait a minute before asking again."
+            else:
+                yield "I couldn't generate an explanation right now."
+            return
+        finally:
+            # Runs on completion and on GeneratorExit/cancellation alike
+            record_stage("tutor_upstream", upstream_seconds)
+            if chunks is not None and hasattr(chunks, "aclose"):
+                await chunks.aclose()
+
+        self.cache.set(key, "".join(parts))
 
 tutor_service = TutorService()
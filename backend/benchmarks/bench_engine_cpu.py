@@ -0,0 +1,91 @@
+"""Engine CPU-seconds per 1,000 computer moves at each difficulty.
+
+Plays --moves sampled positions per difficulty through AsyncStockfishAI (reply
+cache and opening book disabled, so every non-instant reply searches) and,
+for comparison, through the previous fixed Limit(time=0.1). CPU time is
+read from the Stockfish process in /proc, so this needs Linux and a local
+Stockfish (STOCKFISH_PATH). Run from backend/:
+
+    python -m benchmarks.bench_engine_cpu --moves 200
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+
+import chess
+import chess.engine
+
+from app.services.ai_service import DIFFICULTY_TO_SKILL, AsyncEnginePool, AsyncStockfishAI
+from app.services.move_cache import ReplyCache
+
+FIXED_LIMIT = chess.engine.Limit(time=0.1)
+
+
+def sample_positions(count: int, seed: int) -> list[str]:
+    """Positions reached by 0-80 random plies, so openings through endgames are covered."""
+    rng = random.Random(seed)
+    fens = []
+    while len(fens) < count:
+        board = chess.Board()
+        for _ in range(rng.randint(0, 80)):
+            if board.is_game_over():
+                break
+            board.push(rng.choice(list(board.legal_moves)))
+        if not board.is_game_over():
+            fens.append(board.fen())
+    return fens
+
+
+async def engine_cpu_seconds(pool: AsyncEnginePool) -> float:
+    """utime + stime of the pool's single Stockfish process."""
+    async with pool.checkout() as pooled:
+        pid = pooled.transport.get_pid()
+    with open(f"/proc/{pid}/stat") as f:
+        # Fields after the parenthesised command name; utime and stime are 14th and 15th
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+async def fixed_limit_move(pool: AsyncEnginePool, fen: str, difficulty: int) -> None:
+    async with pool.checkout() as pooled:
+        await pooled.set_skill_level(DIFFICULTY_TO_SKILL[difficulty])
+        await pooled.engine.play(chess.Board(fen), FIXED_LIMIT)
+
+
+async def measure(label: str, pool: AsyncEnginePool, fens: list[str], move_fn) -> None:
+    cpu_start = await engine_cpu_seconds(pool)
+    wall_start = time.perf_counter()
+    for fen in fens:
+        await move_fn(fen)
+    wall = (time.perf_counter() - wall_start) / len(fens)
+    cpu = (await engine_cpu_seconds(pool) - cpu_start) / len(fens) * 1000
+    print(f"{label:<24} {cpu:8.1f} CPU-s/1000 moves {wall * 1000:8.1f} ms/move")
+
+
+async def run(fens: list[str], skip_fixed: bool) -> None:
+    # One engine, so /proc CPU covers every search
+    pool = AsyncEnginePool(size=1)
+    ai = AsyncStockfishAI(pool=pool, replies=ReplyCache(maxsize=0, book_path=None))
+    try:
+        for difficulty in sorted(DIFFICULTY_TO_SKILL):
+            if not skip_fixed:
+                await measure(f"level {difficulty} fixed 100 ms", pool, fens, lambda fen: fixed_limit_move(pool, fen, difficulty))
+            await measure(f"level {difficulty} profile", pool, fens, lambda fen: ai.select_move(fen, difficulty))
+    finally:
+        await ai.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--moves", type=int, default=200, help="positions per difficulty")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--skip-fixed", action="store_true", help="skip the Limit(time=0.1) baseline")
+    args = parser.parse_args()
+
+    asyncio.run(run(sample_positions(args.moves, args.seed), args.skip_fixed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Computer-move throughput through engine workers, by worker count.
+
+For each --workers count, starts that many engine worker processes (one
+Stockfish each) on local ports, then plays --moves sampled positions
+through AsyncStockfishAI over remote_pool, keeping two searches per worker
+in flight. The reply cache is disabled and shedding is off, so every
+non-instant reply is a full search. Needs Stockfish (STOCKFISH_PATH).
+Run from backend/:
+
+    python -m benchmarks.bench_engine_workers --workers 1 2 4 8 --moves 400
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from app.services.ai_service import AsyncEnginePool, AsyncStockfishAI
+from app.services.move_cache import ReplyCache
+from app.services.remote_engine import RemotePooledEngine
+from benchmarks.bench_engine_cpu import sample_positions
+
+
+def wait_for_port(port: int, timeout: float = 10) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("localhost", port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"worker on port {port} did not start")
+
+
+async def play(fens: list[str], workers: int, base_port: int, difficulty: int) -> float:
+    engines = [RemotePooledEngine("localhost", base_port + i) for i in range(workers)]
+    pool = AsyncEnginePool(engines=engines, queue_size=len(fens), shed_at=len(fens) + 1)
+    ai = AsyncStockfishAI(pool=pool, replies=ReplyCache(maxsize=0, book_path=None))
+    in_flight = asyncio.Semaphore(2 * workers)
+
+    async def move(fen: str) -> None:
+        async with in_flight:
+            await ai.select_move(fen, difficulty)
+
+    try:
+        # Connect and warm every worker before timing
+        await asyncio.gather(*(move(fen) for fen in fens[:workers]))
+        started = time.perf_counter()
+        await asyncio.gather(*(move(fen) for fen in fens))
+        return time.perf_counter() - started
+    finally:
+        await ai.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--moves", type=int, default=400)
+    parser.add_argument("--difficulty", type=int, default=6)
+    parser.add_argument("--port", type=int, default=7101)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    fens = sample_positions(args.moves, args.seed)
+    baseline = None
+    for workers in args.workers:
+        process = subprocess.Popen(
+            [sys.executable, "-m", "app.services.engine_worker", "--host", "localhost",
+             "--port", str(args.port), "--workers", str(workers)],
+            stdout=subprocess.DEVNULL,
+        )
+        try:
+            for port in range(args.port, args.port + workers):
+                wait_for_port(port)
+            elapsed = asyncio.run(play(fens, workers, args.port, args.difficulty))
+        finally:
+            process.terminate()
+            process.wait()
+
+        rate = len(fens) / elapsed
+        baseline = baseline or rate / workers
+        print(f"workers {workers:>3}  {rate:8.1f} moves/s  scaling {rate / baseline / workers:5.0%} of linear"
+              f"  ({os.cpu_count()} CPUs)")
+
+
+if __name__ == "__main__":
+    main()
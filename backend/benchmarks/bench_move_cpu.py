@@ -0,0 +1,84 @@
+"""Micro-benchmark of the per-ply CPU work in POST /games/{id}/move.
+
+Replays --games random games ply by ply through the board handling that
+submit_move used to do (parse FEN, check legality, make_move,
+is_game_over again in get_result) and through the current path (cached board, one
+play() pass). No database or engine is involved. Run from backend/:
+
+    python -m benchmarks.bench_move_cpu --games 200
+"""
+import argparse
+import random
+import time
+
+import chess
+
+from app.services.chess_service import ChessService, board_cache
+
+
+def random_games(games: int, max_plies: int) -> list[tuple[str, list[str]]]:
+    """Each game as (start FEN, [uci, ...])."""
+    played = []
+    for _ in range(games):
+        board = chess.Board()
+        moves = []
+        while len(moves) < max_plies and not board.is_game_over():
+            move = random.choice(list(board.legal_moves))
+            moves.append(move.uci())
+            board.push(move)
+        played.append((chess.STARTING_FEN, moves))
+    return played
+
+
+def legacy_ply(fen: str, move_uci: str) -> str:
+    chess_svc = ChessService(fen)
+    if not chess_svc.is_legal_move(move_uci):
+        raise ValueError(move_uci)
+    move = chess.Move.from_uci(move_uci)
+    chess_svc.board.san(move)
+    chess_svc.board.push(move)
+    fen = chess_svc.fen
+    # is_game_over(), then get_result() repeated it before checking for mate
+    if chess_svc.board.is_game_over():
+        chess_svc.board.is_game_over()
+        chess_svc.board.is_checkmate()
+    return fen
+
+
+def current_ply(game_id: int, fen: str, move_uci: str) -> str:
+    chess_svc = ChessService.for_game(game_id, fen)
+    if chess_svc.play(move_uci) is None:
+        raise ValueError(move_uci)
+    fen = chess_svc.fen
+    chess_svc.is_game_over()
+    chess_svc.get_result()
+    chess_svc.release(game_id)
+    return fen
+
+
+def run(label: str, games, ply_fn) -> None:
+    plies = 0
+    start = time.process_time()
+    for game_id, (fen, moves) in enumerate(games):
+        for move_uci in moves:
+            fen = ply_fn(game_id, fen, move_uci)
+            plies += 1
+    elapsed = time.process_time() - start
+    print(f"{label:<28} {elapsed / plies * 1e6:7.1f} us CPU/ply over {plies} plies")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=200)
+    parser.add_argument("--plies", type=int, default=120)
+    args = parser.parse_args()
+
+    games = random_games(args.games, args.plies)
+    board_cache.clear()
+    run("FEN parse + double checks", games, lambda game_id, fen, uci: legacy_ply(fen, uci))
+    run("cached board + one pass", games, current_ply)
+    print(f"board cache: {board_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
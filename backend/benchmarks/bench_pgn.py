@@ -0,0 +1,85 @@
+"""PGN import and export throughput in games per second.
+
+Writes --games random games (20-160 plies) to --file unless it already
+exists, imports them for a new benchmark user through import_pgn, then
+streams them back out through export_games. Imported games are also added
+to the opening explorer, so run it against a throwaway database
+(DATABASE_URL). Run from backend/:
+
+    python -m benchmarks.bench_pgn --games 100000
+"""
+import argparse
+import os
+import random
+import time
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+import chess
+
+from app.database import ReadSessionLocal, SessionLocal
+from app.models import User
+from app.services.move_codec import pack_moves
+from app.services.pgn_service import export_games, game_pgn, import_pgn
+
+RESULTS = ["white_win", "black_win", "draw"]
+
+
+def write_games(path: str, count: int, seed: int) -> None:
+    rng = random.Random(seed)
+    with open(path, "w") as f:
+        for _ in range(count):
+            board = chess.Board()
+            for _ in range(rng.randint(20, 160)):
+                if board.is_game_over():
+                    break
+                board.push(rng.choice(list(board.legal_moves)))
+            game = SimpleNamespace(
+                id=uuid.uuid4(),
+                created_at=datetime.utcnow(),
+                result=rng.choice(RESULTS),
+                difficulty=rng.randint(1, 6),
+                move_data=pack_moves(board.move_stack),
+            )
+            f.write(game_pgn(game, "bench"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=100_000)
+    parser.add_argument("--file", default="/tmp/bench_games.pgn")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.file):
+        print(f"writing {args.games} games to {args.file}")
+        write_games(args.file, args.games, args.seed)
+    size_mb = os.path.getsize(args.file) / 1e6
+
+    with SessionLocal() as db:
+        user = User(firebase_uid=f"bench-pgn-{uuid.uuid4()}")
+        db.add(user)
+        db.commit()
+        user_id = user.id
+
+        started = time.perf_counter()
+        with open(args.file) as f:
+            counts = import_pgn(db, f, user_id)
+        elapsed = time.perf_counter() - started
+    print(f"import  {counts['imported']} games ({counts['skipped']} skipped, {size_mb:.1f} MB) "
+          f"in {elapsed:.1f} s: {counts['imported'] / elapsed:,.0f} games/s")
+
+    started = time.perf_counter()
+    exported = written = 0
+    with ReadSessionLocal() as db:
+        for chunk in export_games(db, user_id, "bench"):
+            exported += chunk.count("[GameId ")
+            written += len(chunk)
+    elapsed = time.perf_counter() - started
+    print(f"export  {exported} games ({written / 1e6:.1f} MB) in {elapsed:.1f} s: "
+          f"{exported / elapsed:,.0f} games/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Fan-out latency of game events to many subscribers of one game.
+
+Default mode measures the in-process GameHub with the in-memory broker:
+--subscribers consumer tasks on one game, --events events published, and
+the delay from publish to each subscriber decoding the event.
+
+With --url, it runs end to end against a running server instead. It
+creates a game, opens --subscribers WebSockets to /games/{id}/ws, plays
+--events moves over HTTP, and measures from sending each POST to every
+client receiving the human move event. Raise the open-file limit first
+(ulimit -n 4096). Run from backend/:
+
+    python -m benchmarks.bench_ws_fanout --subscribers 1000
+    python -m benchmarks.bench_ws_fanout --subscribers 1000 --url http://localhost:8000
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+import chess
+
+from app.services.game_events import GameHub, InMemoryBroker
+
+
+def report(latencies: list[float], expected: int) -> None:
+    latencies.sort()
+    ms = [value * 1000 for value in latencies]
+    print(f"deliveries {len(ms)}/{expected}")
+    if ms:
+        p99 = ms[min(len(ms) - 1, int(len(ms) * 0.99))]
+        print(f"p50 {statistics.median(ms):.2f} ms  p99 {p99:.2f} ms  max {ms[-1]:.2f} ms")
+
+
+async def in_process(subscribers: int, events: int) -> None:
+    hub = GameHub(InMemoryBroker(), queue_size=events + 1)
+    await hub.start()
+    game_id = "bench"
+    latencies: list[float] = []
+    ready = asyncio.Barrier(subscribers + 1)
+
+    async def subscriber():
+        async with hub.subscribe(game_id) as queue:
+            await ready.wait()
+            for _ in range(events):
+                event = json.loads(await queue.get())
+                latencies.append(time.perf_counter() - event["sent"])
+
+    tasks = [asyncio.create_task(subscriber()) for _ in range(subscribers)]
+    await ready.wait()
+    for ply in range(events):
+        await hub.publish(game_id, {"type": "move", "ply": ply, "sent": time.perf_counter()})
+        # Let every subscriber drain before the next event, like moves seconds apart
+        await asyncio.sleep(0.01)
+    await asyncio.gather(*tasks)
+    await hub.close()
+    report(latencies, subscribers * events)
+
+
+async def end_to_end(url: str, subscribers: int, events: int) -> None:
+    import httpx
+    import websockets
+
+    async with httpx.AsyncClient(base_url=url, timeout=30) as client:
+        game = (await client.post("/games", json={"difficulty": 1})).json()
+        ws_url = url.replace("http", "ws", 1) + f"/games/{game['game_id']}/ws"
+
+        connections = []
+        for _ in range(subscribers):
+            ws = await websockets.connect(ws_url, max_queue=None)
+            await ws.recv()  # snapshot
+            connections.append(ws)
+
+        latencies: list[float] = []
+        board = chess.Board(game["current_position"])
+        for _ in range(events):
+            if board.is_game_over():
+                break
+            move = random.choice(list(board.legal_moves)).uci()
+            sent = time.perf_counter()
+
+            async def receive_human_move(ws):
+                while True:
+                    event = json.loads(await ws.recv())
+                    if event["type"] == "move" and event.get("by") == "human":
+                        latencies.append(time.perf_counter() - sent)
+                        return
+
+            waiters = [asyncio.create_task(receive_human_move(ws)) for ws in connections]
+            response = (await client.post(f"/games/{game['game_id']}/move", json={"move": move})).json()
+            await asyncio.gather(*waiters)
+            board = chess.Board(response["current_position"])
+            if response["status"] == "finished":
+                break
+
+        for ws in connections:
+            await ws.close()
+    report(latencies, subscribers * events)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, default=1000)
+    parser.add_argument("--events", type=int, default=20)
+    parser.add_argument("--url", help="run end to end against this server, e.g. http://localhost:8000")
+    args = parser.parse_args()
+
+    if args.url:
+        asyncio.run(end_to_end(args.url.rstrip("/"), args.subscribers, args.events))
+    else:
+        asyncio.run(in_process(args.subscribers, args.events))
+
+
+if __name__ == "__main__":
+    main()
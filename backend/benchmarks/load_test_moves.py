@@ -0,0 +1,108 @@
+"""Concurrent-move load test for POST /games/{id}/move.
+
+Plays many games at once against a running API and reports move throughput,
+move latency and /health latency measured while the moves are in flight.
+Moves refused with 503 by engine admission control are retried after
+Retry-After and counted as rejected. Run it once against a server on the
+old sync endpoint and once against the async one to compare:
+
+    uvicorn app.main:app --port 8000
+    python benchmarks/load_test_moves.py --base-url http://localhost:8000 --games 64 --plies 10
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import chess
+import httpx
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def play_game(client: httpx.AsyncClient, plies: int, difficulty: int, latencies: list[float], rejected: list[int]) -> int:
+    res = await client.post("/games", json={"difficulty": difficulty})
+    res.raise_for_status()
+    game = res.json()
+    board = chess.Board(game["current_position"])
+
+    played = 0
+    for _ in range(plies):
+        if board.is_game_over():
+            break
+        move = random.choice(list(board.legal_moves)).uci()
+        while True:
+            start = time.perf_counter()
+            res = await client.post(f"/games/{game['game_id']}/move", json={"move": move})
+            latencies.append(time.perf_counter() - start)
+            if res.status_code != 503:
+                break
+            # Shed by engine admission control; the move was not applied
+            rejected.append(1)
+            await asyncio.sleep(float(res.headers.get("Retry-After", "1")))
+        res.raise_for_status()
+        played += 1
+        data = res.json()
+        board = chess.Board(data["current_position"])
+        if data["status"] == "finished":
+            break
+    return played
+
+
+async def probe_health(client: httpx.AsyncClient, stop: asyncio.Event, latencies: list[float]) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/health")
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0.05)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--games", type=int, default=64, help="games played concurrently")
+    parser.add_argument("--plies", type=int, default=10, help="human moves per game")
+    parser.add_argument("--difficulty", type=int, default=3)
+    args = parser.parse_args()
+
+    move_latencies: list[float] = []
+    rejected: list[int] = []
+    health_latencies: list[float] = []
+    limits = httpx.Limits(max_connections=args.games + 1)
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60, limits=limits) as client:
+        stop = asyncio.Event()
+        prober = asyncio.create_task(probe_health(client, stop, health_latencies))
+
+        start = time.perf_counter()
+        played = await asyncio.gather(*(
+            play_game(client, args.plies, args.difficulty, move_latencies, rejected)
+            for _ in range(args.games)
+        ))
+        elapsed = time.perf_counter() - start
+
+        stop.set()
+        await prober
+
+    total = sum(played)
+    print(f"games={args.games} moves={total} elapsed={elapsed:.2f}s throughput={total / elapsed:.1f} moves/s rejected={len(rejected)}")
+    print(
+        f"move latency  p50={percentile(move_latencies, 50) * 1000:.0f}ms "
+        f"p95={percentile(move_latencies, 95) * 1000:.0f}ms "
+        f"mean={statistics.fmean(move_latencies) * 1000:.0f}ms"
+    )
+    print(
+        f"/health latency p50={percentile(health_latencies, 50) * 1000:.0f}ms "
+        f"p95={percentile(health_latencies, 95) * 1000:.0f}ms "
+        f"max={max(health_latencies, default=0) * 1000:.0f}ms"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
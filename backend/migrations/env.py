@@ -0,0 +1,58 @@
+# Revisions target PostgreSQL only (bytea defaults, CREATE INDEX CONCURRENTLY,
+# partial indexes), like the models themselves
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import engine_from_config, pool
+
+from app.database import Base, DATABASE_URL
+from app import models  # noqa: F401  (registers tables on Base.metadata)
+
+config = context.config
+config.set_main_option("sqlalchemy.url", DATABASE_URL.replace("%", "%%"))
+
+# Skipped when the app runs migrations at startup, so its loggers are kept
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline() -> None:
+    context.configure(
+        url=config.get_main_option("sqlalchemy.url"),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    # app.database.run_migrations passes in the connection holding its lock
+    if (connection := config.attributes.get("connection")) is not None:
+        do_run_migrations(connection)
+        return
+
+    connectable = engine_from_config(
+        config.get_section(config.config_ini_section, {}),
+        prefix="sqlalchemy.",
+        poolclass=pool.NullPool,
+    )
+    with connectable.connect() as connection:
+        do_run_migrations(connection)
+
+
+def do_run_migrations(connection) -> None:
+    # One transaction per revision: revisions with an autocommit block
+    # (e.g. CREATE INDEX CONCURRENTLY) commit whatever ran before them
+    context.configure(connection=connection, target_metadata=target_metadata, transaction_per_migration=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,106 @@
+"""Baseline schema
+
+Databases created before migrations existed were built by
+Base.metadata.create_all, so every table and index here is only created if
+it is missing. On those databases this revision just records the baseline.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+
+    if "users" not in tables:
+        op.create_table(
+            "users",
+            sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+            sa.Column("firebase_uid", sa.String(128), nullable=False),
+            sa.Column("username", sa.String(50), nullable=True),
+            sa.Column("email", sa.String(255), nullable=True),
+            sa.Column("display_name", sa.String(255), nullable=True),
+            sa.Column("photo_url", sa.Text, nullable=True),
+            sa.Column("created_at", sa.DateTime, nullable=True),
+            sa.Column("updated_at", sa.DateTime, nullable=True),
+        )
+        op.create_index("ix_users_firebase_uid", "users", ["firebase_uid"], unique=True)
+        op.create_index("ix_users_username", "users", ["username"], unique=True)
+
+    if "games" not in tables:
+        op.create_table(
+            "games",
+            sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+            sa.Column("status", sa.String(20), nullable=False),
+            sa.Column("current_position", sa.Text, nullable=False),
+            sa.Column("turn", sa.String(10), nullable=False),
+            sa.Column("result", sa.String(20), nullable=True),
+            sa.Column("difficulty", sa.Integer, nullable=False),
+            sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=True),
+            sa.Column("created_at", sa.DateTime, nullable=True),
+            sa.Column("updated_at", sa.DateTime, nullable=True),
+        )
+        op.create_index("ix_games_user_id", "games", ["user_id"])
+
+    game_indexes = {index["name"] for index in inspector.get_indexes("games")} if "games" in tables else set()
+    if "ix_games_user_id_created_at" not in game_indexes:
+        op.create_index(
+            "ix_games_user_id_created_at", "games",
+            ["user_id", sa.text("created_at DESC"), sa.text("id DESC")],
+        )
+    if "ix_games_user_id_updated_at" not in game_indexes:
+        op.create_index("ix_games_user_id_updated_at", "games", ["user_id", "updated_at", "id"])
+
+    if "moves" not in tables:
+        op.create_table(
+            "moves",
+            sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+            sa.Column("game_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("games.id"), nullable=False),
+            sa.Column("move_number", sa.Integer, nullable=False),
+            sa.Column("move_input", sa.String(10), nullable=False),
+            sa.Column("move_notation", sa.String(10), nullable=True),
+            sa.Column("position_after", sa.Text, nullable=False),
+            sa.Column("created_at", sa.DateTime, nullable=True),
+        )
+
+    if "analysis_cache" not in tables:
+        op.create_table(
+            "analysis_cache",
+            sa.Column("fen_key", sa.String(100), primary_key=True),
+            sa.Column("depth", sa.Integer, nullable=False),
+            sa.Column("multipv", sa.Integer, nullable=False),
+            sa.Column("lines", postgresql.JSONB, nullable=False),
+            sa.Column("updated_at", sa.DateTime, nullable=True),
+        )
+
+    if "game_reviews" not in tables:
+        op.create_table(
+            "game_reviews",
+            sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+            sa.Column("game_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("games.id"), nullable=False),
+            sa.Column("status", sa.String(20), nullable=False),
+            sa.Column("depth", sa.Integer, nullable=False),
+            sa.Column("annotations", postgresql.JSONB, nullable=True),
+            sa.Column("error", sa.Text, nullable=True),
+            sa.Column("created_at", sa.DateTime, nullable=True),
+            sa.Column("finished_at", sa.DateTime, nullable=True),
+        )
+        op.create_index("ix_game_reviews_game_id", "game_reviews", ["game_id"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_table("game_reviews")
+    op.drop_table("analysis_cache")
+    op.drop_table("moves")
+    op.drop_table("games")
+    op.drop_table("users")
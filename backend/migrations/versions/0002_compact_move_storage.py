@@ -0,0 +1,82 @@
+"""Compact move storage on games
+
+Adds games.move_data (2 bytes per ply) and games.checkpoints (a FEN every
+CHECKPOINT_INTERVAL plies), then backfills both from the moves table in
+chunks of games. Duplicate plies left by retried requests are removed
+first (the earliest row is kept); replaying one would push a move that is
+illegal in its position.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+import chess
+from alembic import op
+import sqlalchemy as sa
+
+from app.services.move_codec import build_checkpoints, pack_moves
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+BACKFILL_CHUNK = 500
+
+
+def upgrade() -> None:
+    op.add_column("games", sa.Column("move_data", sa.LargeBinary, nullable=False, server_default=sa.text("''::bytea")))
+    op.add_column("games", sa.Column("checkpoints", sa.Text, nullable=False, server_default=""))
+
+    op.execute(
+        """
+        DELETE FROM moves
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT id, row_number() OVER (PARTITION BY game_id, move_number ORDER BY id) AS n
+                FROM moves
+            ) ranked
+            WHERE n > 1
+        )
+        """
+    )
+
+    bind = op.get_bind()
+    games = sa.table(
+        "games",
+        sa.column("id"),
+        sa.column("move_data", sa.LargeBinary),
+        sa.column("checkpoints", sa.Text),
+    )
+    moves = sa.table("moves", sa.column("game_id"), sa.column("move_number"), sa.column("move_input"))
+
+    last_id = None
+    while True:
+        query = sa.select(games.c.id).order_by(games.c.id).limit(BACKFILL_CHUNK)
+        if last_id is not None:
+            query = query.where(games.c.id > last_id)
+        game_ids = bind.execute(query).scalars().all()
+        if not game_ids:
+            break
+        last_id = game_ids[-1]
+
+        rows = bind.execute(
+            sa.select(moves.c.game_id, moves.c.move_input)
+            .where(moves.c.game_id.in_(game_ids))
+            .order_by(moves.c.game_id, moves.c.move_number)
+        ).all()
+        by_game: dict = {}
+        for game_id, move_input in rows:
+            by_game.setdefault(game_id, []).append(chess.Move.from_uci(move_input))
+
+        for game_id, game_moves in by_game.items():
+            bind.execute(
+                games.update()
+                .where(games.c.id == game_id)
+                .values(move_data=pack_moves(game_moves), checkpoints=build_checkpoints(game_moves))
+            )
+
+
+def downgrade() -> None:
+    op.drop_column("games", "checkpoints")
+    op.drop_column("games", "move_data")
@@ -0,0 +1,34 @@
+"""Unique (game_id, move_number) on moves
+
+moves had no index on game_id, so every game.moves load scanned the table.
+A unique key on (game_id, move_number) covers both the filter and the
+ORDER BY, and stops a retried request from writing the same ply twice.
+
+Duplicate plies left by such retries were already removed by 0002, before
+its backfill. The index is built CONCURRENTLY so writes to moves are not
+blocked while it builds, then attached as the constraint.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+NAME = "uq_moves_game_id_move_number"
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        # A failed concurrent build leaves an INVALID index behind
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {NAME}")
+        op.execute(f"CREATE UNIQUE INDEX CONCURRENTLY {NAME} ON moves (game_id, move_number)")
+    op.execute(f"ALTER TABLE moves ADD CONSTRAINT {NAME} UNIQUE USING INDEX {NAME}")
+
+
+def downgrade() -> None:
+    op.drop_constraint(NAME, "moves", type_="unique")
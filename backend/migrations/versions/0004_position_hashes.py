@@ -0,0 +1,62 @@
+"""Zobrist position history on games
+
+Adds games.position_hashes, the 8-byte Zobrist hash of every position since
+the last irreversible move, so threefold repetition can be detected without
+replaying the game. Active games are backfilled from move_data; finished
+games can no longer repeat and keep an empty history.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.services.chess_service import repetition_history
+from app.services.move_codec import unpack_moves
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+BACKFILL_CHUNK = 500
+
+
+def upgrade() -> None:
+    op.add_column("games", sa.Column("position_hashes", sa.LargeBinary, nullable=False, server_default=sa.text("''::bytea")))
+
+    bind = op.get_bind()
+    games = sa.table(
+        "games",
+        sa.column("id"),
+        sa.column("status", sa.String),
+        sa.column("move_data", sa.LargeBinary),
+        sa.column("position_hashes", sa.LargeBinary),
+    )
+
+    last_id = None
+    while True:
+        query = (
+            sa.select(games.c.id, games.c.move_data)
+            .where(games.c.status == "active")
+            .order_by(games.c.id)
+            .limit(BACKFILL_CHUNK)
+        )
+        if last_id is not None:
+            query = query.where(games.c.id > last_id)
+        rows = bind.execute(query).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        for game_id, move_data in rows:
+            bind.execute(
+                games.update()
+                .where(games.c.id == game_id)
+                .values(position_hashes=repetition_history(unpack_moves(move_data)))
+            )
+
+
+def downgrade() -> None:
+    op.drop_column("games", "position_hashes")
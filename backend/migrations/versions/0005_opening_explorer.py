@@ -0,0 +1,45 @@
+"""Opening explorer position index
+
+Adds explorer_moves, the moves played from every position of finished
+games with their results, and games.explorer_indexed to track which games
+it already counts. Existing games are not indexed here, since that can take
+a while on a large table; run the rebuild job once after upgrading:
+
+    python -m app.services.explorer
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("games", sa.Column("explorer_indexed", sa.Boolean, nullable=False, server_default=sa.false()))
+    op.create_index(
+        "ix_games_explorer_pending",
+        "games",
+        ["id"],
+        postgresql_where=sa.text("status = 'finished' AND NOT explorer_indexed"),
+    )
+    op.create_table(
+        "explorer_moves",
+        sa.Column("position_hash", sa.BigInteger, primary_key=True),
+        sa.Column("move", sa.String(5), primary_key=True),
+        sa.Column("count", sa.Integer, nullable=False),
+        sa.Column("white_wins", sa.Integer, nullable=False),
+        sa.Column("draws", sa.Integer, nullable=False),
+        sa.Column("black_wins", sa.Integer, nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("explorer_moves")
+    op.drop_index("ix_games_explorer_pending", table_name="games")
+    op.drop_column("games", "explorer_indexed")
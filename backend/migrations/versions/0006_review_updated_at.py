@@ -0,0 +1,25 @@
+"""Track when a review last changed state
+
+Adds game_reviews.updated_at, so a review left queued or running by a
+restart can be told apart from one still in progress and requeued.
+Existing rows keep NULL and fall back to created_at.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("game_reviews", sa.Column("updated_at", sa.DateTime, nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("game_reviews", "updated_at")
@@ -60,14 +60,22 @@ export function MoveAnalysisCard({ fen, move, rank, bestMove, alternative, autoE
         if (!fen || !move || !bestMove) return;
         setIsExplaining(true);
         try {
-            const res = await import('../../lib/api').then(m => m.explainMove(
-                fen,
-                move.uci,
-                bestMove.uci,
-                move.pv,
-                bestMove.pv,
-                alternative?.uci,
-                alternative?.pv
+            // Stream so the first words show up before generation finishes
+            let streamed = '';
+            const res = await import('../../lib/api').then(m => m.explainMoveStream(
+                {
+                    fen,
+                    move: move.uci,
+                    best_move: bestMove.uci,
+                    player_pv: move.pv,
+                    best_pv: bestMove.pv,
+                    alternative_move: alternative?.uci,
+                    alternative_pv: alternative?.pv,
+                },
+                (text) => {
+                    streamed += text;
+                    setExplanation(streamed);
+                }
             ));
 
             setExplanation(res.explanation);
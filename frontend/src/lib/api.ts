@@ -27,6 +27,7 @@ export interface GameResponse {
   current_position: string;
   difficulty: number;
   moves: { move_number: number; move: string }[];
+  move_count: number;
 }
 
 export const DIFFICULTY_LABELS: Record<number, string> = {
@@ -120,3 +121,59 @@ export async function explainMove(
   }
   return res.json();
 }
+
+/**
+ * Streaming variant of explainMove. Calls onDelta with each text chunk as
+ * it arrives and resolves with the full explanation. Aborting the signal
+ * closes the connection, which also stops the upstream generation.
+ */
+export async function explainMoveStream(
+  params: {
+    fen: string;
+    move: string;
+    best_move?: string;
+    player_pv?: string;
+    best_pv?: string;
+    alternative_move?: string;
+    alternative_pv?: string;
+  },
+  onDelta: (text: string) => void,
+  signal?: AbortSignal
+): Promise<TutorResponse> {
+  const res = await fetch(`${API_BASE}/tutor/explain/stream`, {
+    method: "POST",
+    headers: await getAuthHeaders(),
+    body: JSON.stringify(params),
+    signal,
+  });
+  if (!res.ok || !res.body) {
+    throw new Error("Failed to get explanation");
+  }
+
+  const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+  let buffer = "";
+  let explanation = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += value;
+
+    // SSE events are separated by a blank line
+    let boundary;
+    while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+      const raw = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      const event = raw.match(/^event: (.*)$/m)?.[1];
+      const data = raw.match(/^data: (.*)$/m)?.[1];
+      if (!data) continue;
+      const payload = JSON.parse(data);
+      if (event === "delta") {
+        explanation += payload.text;
+        onDelta(payload.text);
+      } else if (event === "done") {
+        explanation = payload.explanation;
+      }
+    }
+  }
+  return { explanation };
+}